@@ -0,0 +1,118 @@
+import time
+from abc import ABC, abstractmethod
+
+import numpy as np
+
+from message import MessagePool
+
+
+class ARQ_sender(ABC):
+    # Общая часть отправителей протоколов с автоматическим запросом повтора:
+    # счетчики, оценка времени оборота и срок повтора
+
+    # Во сколько раз срок повтора может вырасти при экспоненциальном откате
+    MAX_BACKOFF = 64
+
+    def __init__(
+        self,
+        answer_msg_queue,
+        send_msg_queue,
+        posted_msgs,
+        window_size,
+        max_number,
+        timeout,
+        clock=time.time,
+        pool=None,
+        adaptive_timeout=True,
+        granularity=0.0,
+    ):
+        self.answer_msg_queue = answer_msg_queue
+        self.send_msg_queue = send_msg_queue
+        self.posted_msgs = posted_msgs
+        self.window_size = window_size
+        self.max_number = max_number
+        self.timeout = timeout
+        self.clock = clock
+        self.pool = pool if pool is not None else MessagePool()
+        self.ans_count = 0
+        self.sent_count = 0
+        self.retransmissions = 0
+
+        # Время от первой отправки сообщения до его подтверждения
+        self.latency_sum = 0.0
+
+        # Срок повтора по оценке времени оборота (Jacobson/Karels),
+        # timeout задает начальное значение, granularity - шаг часов отправителя
+        self.adaptive_timeout = adaptive_timeout
+        self.granularity = granularity
+        self.rto = timeout
+        self.max_rto = timeout * ARQ_sender.MAX_BACKOFF
+        self.srtt = None
+        self.rttvar = 0.0
+
+        # Множитель экспоненциального отката и время последнего удвоения
+        self.backoff = 1
+        self.backoff_time = -np.inf
+
+    @abstractmethod
+    def send(self):
+        pass
+
+    @abstractmethod
+    def next_deadline(self):
+        # Ближайший срок повтора, np.inf, если ждать нечего
+        pass
+
+    def update_rtt(self, sample):
+        if self.srtt is None:
+            self.srtt = sample
+            self.rttvar = sample / 2
+        else:
+            self.rttvar = 0.75 * self.rttvar + 0.25 * abs(self.srtt - sample)
+            self.srtt = 0.875 * self.srtt + 0.125 * sample
+        self.rto = min(self.srtt + max(self.granularity, 4 * self.rttvar), self.max_rto)
+
+    def retransmission_timeout(self):
+        # Срок ожидания подтверждения, общий для всех сообщений окна
+        if not self.adaptive_timeout:
+            return self.timeout
+        return min(self.rto * self.backoff, self.max_rto)
+
+    def back_off(self, send_times, curr_time):
+        # Истек срок повтора сообщений, отправленных в моменты send_times:
+        # общий срок удваивается (RFC 6298, 5.5), но не больше одного раза
+        # за срок - сообщения окна, отправленные до удвоения, его не повторяют
+        if self.adaptive_timeout and np.max(send_times) >= self.backoff_time:
+            self.backoff = min(2 * self.backoff, ARQ_sender.MAX_BACKOFF)
+            self.backoff_time = curr_time
+
+    def reset_backoff(self):
+        # Подтверждение нового сообщения показывает, что путь работает: откат
+        # отменяется, даже если по правилу Карна время оборота не измерено
+        self.backoff = 1
+
+    def efficiency(self):
+        # Доля отправок, которые не были повторами
+        if self.sent_count == 0:
+            return 1.0
+        return 1 - self.retransmissions / self.sent_count
+
+    def mean_latency(self):
+        if self.ans_count == 0:
+            return 0.0
+        return self.latency_sum / self.ans_count
+
+    def is_finished(self):
+        return self.ans_count == self.max_number
+
+
+class ARQ_receiver(ABC):
+    def __init__(self, answer_msg_queue, send_msg_queue, received_msgs, pool=None):
+        self.answer_msg_queue = answer_msg_queue
+        self.send_msg_queue = send_msg_queue
+        self.received_msgs = received_msgs
+        self.pool = pool if pool is not None else MessagePool()
+
+    @abstractmethod
+    def receive(self):
+        pass
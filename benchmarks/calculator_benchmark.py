@@ -0,0 +1,80 @@
+import os
+import sys
+import timeit
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from satellite import (  # noqa: E402
+    Calculator,
+    eccentric_anomaly,
+    true_anomaly,
+)
+
+
+def make_calculator(count, seed=0):
+    rng = np.random.default_rng(seed)
+    elements = np.column_stack(
+        (
+            rng.uniform(6.9, 42.0, count),
+            rng.uniform(0.0, 0.75, count),
+            np.radians(rng.uniform(0.0, 180.0, count)),
+            np.radians(rng.uniform(0.0, 360.0, count)),
+            np.radians(rng.uniform(0.0, 360.0, count)),
+            np.radians(rng.uniform(0.0, 360.0, count)),
+        )
+    )
+    # Часы остановлены, чтобы обе формулы считали один и тот же момент
+    return Calculator.from_elements(500.0, elements, clock=lambda: 1.0)
+
+
+def per_frame_position(calculator):
+    # Прежний расчет координат в каждом кадре: среднее движение, истинная
+    # аномалия, радиус и тригонометрия поворота орбиты вычисляются заново
+    a, e, i = calculator.a, calculator.e, calculator.i
+    omega, w = calculator.omega, calculator.w
+    delta_t = calculator.delta_time(calculator.clock())
+    M = calculator.m + np.sqrt(calculator.mu / (a * 1000) ** 3) * delta_t
+    E = eccentric_anomaly(M, e)
+    nu = true_anomaly(E, e)
+    r = a * (1 - e * np.cos(E))
+
+    x_orb = r * np.cos(nu)
+    y_orb = r * np.sin(nu)
+
+    x_eq = x_orb * (
+        np.cos(omega) * np.cos(w) - np.sin(omega) * np.sin(w) * np.cos(i)
+    ) - y_orb * (np.cos(omega) * np.sin(w) + np.sin(omega) * np.cos(w) * np.cos(i))
+    y_eq = x_orb * (
+        np.sin(omega) * np.cos(w) + np.cos(omega) * np.sin(w) * np.cos(i)
+    ) + y_orb * (-np.sin(omega) * np.sin(w) + np.cos(omega) * np.cos(w) * np.cos(i))
+    z_eq = x_orb * np.sin(i) * np.sin(w) + y_orb * np.sin(i) * np.cos(w)
+    return np.hstack((x_eq, y_eq, z_eq))
+
+
+def main():
+    print(
+        f"{'satellites':>10} {'per frame, ms':>14} {'cached, ms':>11} "
+        f"{'speedup':>8} {'max error, km':>14}"
+    )
+    for count in (10, 1000, 100000):
+        calculator = make_calculator(count)
+        number = max(1, 100000 // count)
+        old = min(
+            timeit.repeat(
+                lambda: per_frame_position(calculator), number=number, repeat=5
+            )
+        )
+        cached = min(timeit.repeat(calculator.update_position, number=number, repeat=5))
+        # Координаты в тыс. км, ошибка выводится в км
+        error = np.max(np.abs(calculator.positions() - per_frame_position(calculator)))
+        print(
+            f"{count:>10} {old / number * 1e3:>14.3f} "
+            f"{cached / number * 1e3:>11.3f} {old / cached:>8.2f} "
+            f"{error * 1e3:>14.2e}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+import os
+import sys
+import timeit
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from routing import ROUTING_BACKENDS  # noqa: E402
+from topology import Topology  # noqa: E402
+
+
+def make_graph(count, dashes=10, seed=0):
+    # Случайное созвездие на высотах от 0.5 до 2 тыс. км и станции на поверхности
+    rng = np.random.default_rng(seed)
+    earth_radius = 6.371
+
+    directions = rng.normal(size=(count - dashes, 3))
+    directions /= np.linalg.norm(directions, axis=1, keepdims=True)
+    satellites = directions * rng.uniform(6.9, 8.4, (count - dashes, 1))
+
+    directions = rng.normal(size=(dashes, 3))
+    directions /= np.linalg.norm(directions, axis=1, keepdims=True)
+    dash_pos = directions * earth_radius
+
+    # Дальность межспутниковых связей подобрана так, чтобы у спутника
+    # было в среднем около десяти соседей в сферическом слое
+    shell_volume = 4 / 3 * np.pi * (8.4**3 - 6.9**3)
+    max_isl_range = np.cbrt(30 * shell_volume / (4 / 3 * np.pi * (count - dashes)))
+    topology = Topology(earth_radius, 60, max_isl_range)
+    keys = topology.edge_keys(dash_pos, satellites)
+
+    positions = np.vstack((dash_pos, satellites))
+    u = keys // count
+    v = keys % count
+    weights = np.sum((positions[v] - positions[u]) ** 2, axis=1)
+
+    node_ids = [f"d_{i}" for i in range(dashes)] + [
+        f"s_{i}" for i in range(count - dashes)
+    ]
+    return node_ids, node_ids[:dashes], u, v, weights
+
+
+def main():
+    print(
+        f"{'nodes':>6} {'edges':>7} "
+        + " ".join(f"{b + ', ms':>13}" for b in ROUTING_BACKENDS)
+    )
+    for count in (100, 1000, 10000):
+        node_ids, destinations, u, v, weights = make_graph(count)
+        times = []
+        for backend in ROUTING_BACKENDS.values():
+            routing = backend(node_ids, destinations)
+            number = max(1, 1000 // count)
+            elapsed = min(
+                timeit.repeat(
+                    lambda: routing.update(u, v, weights), number=number, repeat=3
+                )
+            )
+            times.append(elapsed / number * 1e3)
+        print(f"{count:>6} {len(u):>7} " + " ".join(f"{t:>13.3f}" for t in times))
+
+
+if __name__ == "__main__":
+    main()
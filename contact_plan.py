@@ -0,0 +1,214 @@
+import numpy as np
+
+
+class ContactPlan:
+    def __init__(
+        self,
+        topology,
+        calculator,
+        earth,
+        dashes,
+        start,
+        horizon,
+        step=0.1,
+        tolerance=1e-3,
+        batch_size=64,
+        checkpoint_interval=32,
+    ):
+        # Все моменты времени задаются по часам калькулятора
+        self.topology = topology
+        self.calculator = calculator
+        self.earth = earth
+        self.dashes = list(dashes)
+        self.start = start
+        self.end = start + horizon
+
+        # Параметры, при изменении которых план перестает быть верным
+        self.calculator_t0 = calculator.t0
+        self.time_factor = calculator.time_factor
+        self.earth_time_factor = earth.time_factor
+
+        self.dash_count = len(self.dashes)
+        self.node_count = self.dash_count + calculator.a.shape[0]
+
+        initial_keys, events = self.find_events(step, batch_size)
+        self.refine_events(events, step, tolerance)
+        self.build_index(initial_keys, events, step * checkpoint_interval)
+
+    def covers(self, t):
+        return (
+            self.start <= t < self.end
+            and self.calculator.t0 == self.calculator_t0
+            and self.calculator.time_factor == self.time_factor
+            and self.earth.time_factor == self.earth_time_factor
+        )
+
+    def positions(self, times):
+        # Координаты станций (T, D, 3) и спутников (T, S, 3) в моменты times
+        satellite_pos = self.calculator.propagate(times).transpose(1, 0, 2)
+        angles = self.earth.angle_at(times)
+        dash_pos = np.stack(
+            [dash.local_position(angles) for dash in self.dashes], axis=1
+        ).reshape(len(times), self.dash_count, 3)
+        return dash_pos, satellite_pos
+
+    def pair_visibility(self, keys, times):
+        # Видимость пар вершин, заданных ключами ребер, каждая в свой момент времени
+        u = keys // self.node_count
+        v = keys % self.node_count
+        dash = u < self.dash_count
+
+        delta_t = self.calculator.delta_time(times)[:, np.newaxis]
+        p2 = self.calculator.position_at(delta_t, v - self.dash_count)[:, 0]
+        p1 = self.calculator.position_at(
+            delta_t, np.where(dash, 0, u - self.dash_count)
+        )[:, 0]
+        if np.any(dash):
+            angles = self.earth.angle_at(times)
+            dash_pos = np.stack(
+                [dash.local_position(angles) for dash in self.dashes]
+            ).reshape(self.dash_count, len(times), 3)
+            p1[dash] = dash_pos[u[dash], np.flatnonzero(dash)]
+
+        return self.topology.pair_visibility(p1, p2, dash)
+
+    def find_events(self, step, batch_size):
+        # Грубый поиск: состояние связей на равномерной сетке моментов времени,
+        # окна короче шага сетки могут быть пропущены
+        times = np.linspace(
+            self.start,
+            self.end,
+            max(1, int(np.ceil((self.end - self.start) / step))) + 1,
+        )
+        events = []
+        initial_keys = None
+        prev_keys = None
+        prev_t = None
+        for batch in range(0, len(times), batch_size):
+            batch_times = times[batch : batch + batch_size]
+            dash_pos, satellite_pos = self.positions(batch_times)
+            for k, t in enumerate(batch_times):
+                keys = self.topology.edge_keys(dash_pos[k], satellite_pos[k])
+                if prev_keys is None:
+                    initial_keys = keys
+                else:
+                    for changed, rising in (
+                        (np.setdiff1d(keys, prev_keys, assume_unique=True), True),
+                        (np.setdiff1d(prev_keys, keys, assume_unique=True), False),
+                    ):
+                        if changed.size > 0:
+                            events.append(
+                                (
+                                    changed,
+                                    np.full(changed.size, prev_t),
+                                    np.full(changed.size, t),
+                                    np.full(changed.size, rising),
+                                )
+                            )
+                prev_keys = keys
+                prev_t = t
+
+        if events:
+            events = tuple(np.concatenate(column) for column in zip(*events))
+        else:
+            events = (
+                np.empty(0, dtype=np.int64),
+                np.empty(0),
+                np.empty(0),
+                np.empty(0, dtype=bool),
+            )
+        return initial_keys, events
+
+    def refine_events(self, events, step, tolerance):
+        # Уточнение моментов появления и пропадания связей методом бисекции,
+        # для всех событий одновременно
+        keys, lo, hi, rising = events
+        if keys.size == 0:
+            return
+        for _ in range(max(1, int(np.ceil(np.log2(step / tolerance))))):
+            mid = (lo + hi) / 2
+            after = self.pair_visibility(keys, mid) == rising
+            hi[after] = mid[after]
+            lo[~after] = mid[~after]
+
+    def build_index(self, initial_keys, events, checkpoint_step):
+        keys, _, flip_times, rising = events
+        order = np.argsort(flip_times, kind="stable")
+
+        # Окна видимости [start, end) для каждого ребра
+        opened = dict.fromkeys(initial_keys.tolist(), self.start)
+        window_keys = []
+        window_starts = []
+        window_ends = []
+        for key, t, rise in zip(
+            keys[order].tolist(), flip_times[order].tolist(), rising[order].tolist()
+        ):
+            if rise:
+                opened[key] = t
+            elif key in opened:
+                window_keys.append(key)
+                window_starts.append(opened.pop(key))
+                window_ends.append(t)
+        for key, t in opened.items():
+            window_keys.append(key)
+            window_starts.append(t)
+            window_ends.append(self.end)
+
+        order = np.argsort(window_starts, kind="stable")
+        self.window_keys = np.array(window_keys, dtype=np.int64)[order]
+        self.window_starts = np.array(window_starts, dtype=np.float64)[order]
+        self.window_ends = np.array(window_ends, dtype=np.float64)[order]
+
+        self.flip_times = np.unique(flip_times)
+
+        # Контрольные точки: номера окон, открытых в момент каждой точки.
+        # Окно, открытое в момент t, либо есть в ближайшей предыдущей точке,
+        # либо начинается между ней и t
+        self.checkpoint_step = checkpoint_step
+        self.checkpoints = []
+        for t in np.arange(self.start, self.end, checkpoint_step):
+            self.checkpoints.append(
+                np.flatnonzero((self.window_starts <= t) & (self.window_ends > t))
+            )
+
+    def windows_at(self, t):
+        checkpoint = min(
+            int((t - self.start) // self.checkpoint_step), len(self.checkpoints) - 1
+        )
+        checkpoint_time = self.start + checkpoint * self.checkpoint_step
+        first = np.searchsorted(self.window_starts, checkpoint_time, side="right")
+        last = np.searchsorted(self.window_starts, t, side="right")
+        candidates = np.concatenate(
+            (self.checkpoints[checkpoint], np.arange(first, last))
+        )
+        return candidates[self.window_ends[candidates] > t]
+
+    def edge_keys_at(self, t):
+        return np.sort(self.window_keys[self.windows_at(t)])
+
+    def remaining_lifetimes(self, keys, t, horizon):
+        # Сколько еще просуществуют связи keys начиная с момента t, не больше horizon.
+        # Окна, которые не закрываются до конца плана, считаются долгоживущими
+        windows = self.windows_at(t)
+        if len(windows) == 0:
+            return np.zeros(len(keys))
+
+        order = np.argsort(self.window_keys[windows])
+        open_keys = self.window_keys[windows][order]
+        ends = self.window_ends[windows][order]
+        lifetimes = np.where(ends < self.end, ends - t, horizon)
+
+        index = np.minimum(np.searchsorted(open_keys, keys), len(open_keys) - 1)
+        found = open_keys[index] == keys
+        return np.where(found, np.minimum(lifetimes[index], horizon), 0.0)
+
+    def windows(self, key):
+        # Все окна видимости ребра с ключом key
+        mask = self.window_keys == key
+        return np.stack((self.window_starts[mask], self.window_ends[mask]), axis=-1)
+
+    def next_change(self, t):
+        index = np.searchsorted(self.flip_times, t, side="right")
+        if index >= len(self.flip_times):
+            return self.end
+        return self.flip_times[index]
@@ -1,13 +1,21 @@
 import time
 
+import numpy as np
+
 
 class Earth:
-    def __init__(self, loader, time_factor=100):
+    def __init__(self, loader=None, time_factor=100, clock=time.time):
         self.radius = 6.371
-        self.t0 = time.time()
+        self.clock = clock
+        self.t0 = self.clock()
         self.time_factor = time_factor
         self.rotation_step = -360 / (24 * 3600)
         self.angle = 0
+        self.model = None
+
+        # Без загрузчика Земля существует только как модель вращения
+        if loader is None:
+            return
 
         try:
             # Загрузка модели GLTF
@@ -22,12 +30,24 @@ class Earth:
         except Exception as e:
             print(f"Error loading model: {e}")
 
-    def update(self, task):
-        # Вращение модели
-        t = time.time()
+    def center(self):
+        if self.model is None:
+            return np.zeros(3)
+        return np.array([self.model.getX(), self.model.getY(), self.model.getZ()])
+
+    def angle_at(self, t):
+        # Угол поворота Земли в момент t по часам clock
+        return self.angle + (self.t0 - t) * self.rotation_step * self.time_factor
+
+    def rotate(self):
+        t = self.clock()
         delta_t = self.t0 - t
         self.angle += delta_t * self.rotation_step * self.time_factor
-        self.model.setH(self.angle)
         self.t0 = t
 
+    def update(self, task):
+        # Вращение модели
+        self.rotate()
+        self.model.setH(self.angle)
+
         return task.again
@@ -0,0 +1,186 @@
+from message import MessageLog, MessagePool, MsgQueue
+from protocol_gbn import GBN_receiver, GBN_sender
+from protocol_sack import SACK_receiver, SACK_sender
+from protocol_srp import SRP_receiver, SRP_sender
+
+# Протоколы с автоматическим запросом повтора: (отправитель, получатель)
+ARQ_PROTOCOLS = {
+    "srp": (SRP_sender, SRP_receiver),
+    "gbn": (GBN_sender, GBN_receiver),
+    "sack": (SACK_sender, SACK_receiver),
+}
+
+
+class Channel:
+    # Один из путей потока со своей парой очередей
+    def __init__(self, loss_probability, clock, rng):
+        self.path = []
+        self.latency = 0.0  # Задержка распространения по пути, с
+        self.send_msg_queue = MsgQueue(loss_probability, clock, rng=rng)
+        self.answer_msg_queue = MsgQueue(loss_probability, clock, rng=rng)
+
+    def set_path(self, path, latency):
+        self.path = path
+        self.latency = latency
+        self.send_msg_queue.delay = latency
+        self.answer_msg_queue.delay = latency
+
+    def stats(self):
+        sent = self.send_msg_queue.sent + self.answer_msg_queue.sent
+        lost = self.send_msg_queue.lost + self.answer_msg_queue.lost
+        return {
+            "hops": max(0, len(self.path) - 1),
+            "sent": sent,
+            "lost": lost,
+            "loss": lost / sent if sent > 0 else 0.0,
+            "latency": self.latency,
+        }
+
+
+class StripedQueue:
+    # Очереди всех путей потока в виде одной очереди: слоты окна
+    # распределяются между действующими путями по номеру слота, поэтому
+    # подтверждение возвращается по тому же пути, что и сообщение.
+    # Пока путь не найден заново, его доля окна идет по оставшимся путям
+    def __init__(self, channels, answers=False):
+        self.channels = channels
+        self.answers = answers
+        self.cursor = 0
+
+    def queue(self, channel):
+        return channel.answer_msg_queue if self.answers else channel.send_msg_queue
+
+    def has_msg(self):
+        return any(self.queue(channel).has_msg() for channel in self.channels)
+
+    def next_delivery_time(self):
+        return min(
+            self.queue(channel).next_delivery_time() for channel in self.channels
+        )
+
+    def get_message(self):
+        # Очереди путей опрашиваются по кругу
+        for _ in range(len(self.channels)):
+            queue = self.queue(self.channels[self.cursor])
+            self.cursor = (self.cursor + 1) % len(self.channels)
+            if queue.has_msg():
+                return queue.get_message()
+
+    def send_message(self, msg):
+        alive = [channel for channel in self.channels if len(channel.path) > 0]
+        if len(alive) == 0:
+            alive = self.channels
+        self.queue(alive[msg.number % len(alive)]).send_message(msg)
+
+
+class Flow:
+    # Одна передача между парой станций со своим состоянием протокола
+    def __init__(
+        self,
+        id,
+        sender,
+        recipient,
+        packages_count,
+        window_size,
+        timeout,
+        loss_probability,
+        clock,
+        path_count=1,
+        rng=None,
+        adaptive_timeout=True,
+        timeout_granularity=0.0,
+        protocol="srp",
+    ):
+        self.id = id
+        self.sender = sender
+        self.recipient = recipient
+        self.packages_count = packages_count
+        self.protocol = protocol
+
+        self.channels = [
+            Channel(loss_probability, clock, rng) for _ in range(path_count)
+        ]
+        if path_count == 1:
+            self.send_msg_queue = self.channels[0].send_msg_queue
+            self.answer_msg_queue = self.channels[0].answer_msg_queue
+        else:
+            self.send_msg_queue = StripedQueue(self.channels)
+            self.answer_msg_queue = StripedQueue(self.channels, answers=True)
+        self.posted_msgs = MessageLog()
+        self.received_msgs = MessageLog()
+        # Общий пул сообщений отправителя и получателя
+        self.pool = MessagePool()
+
+        # Каждому пути достается своя доля окна из window_size слотов,
+        # поэтому число сообщений в пути растет вместе с числом путей
+        arq_sender, arq_receiver = ARQ_PROTOCOLS[protocol]
+        self.arq_sender = arq_sender(
+            self.answer_msg_queue,
+            self.send_msg_queue,
+            self.posted_msgs,
+            window_size * path_count,
+            packages_count,
+            timeout,
+            clock,
+            self.pool,
+            adaptive_timeout,
+            timeout_granularity,
+        )
+        self.arq_receiver = arq_receiver(
+            self.answer_msg_queue, self.send_msg_queue, self.received_msgs, self.pool
+        )
+
+        self.start_time = clock()
+        self.finish_time = None
+
+    @property
+    def paths(self):
+        return [channel.path for channel in self.channels if len(channel.path) > 0]
+
+    def tick(self):
+        self.arq_sender.send()
+        self.arq_receiver.receive()
+
+    def is_finished(self):
+        return self.arq_sender.is_finished()
+
+    def next_event_time(self):
+        # Ближайшая доставка сообщения или подтверждения либо срок повтора
+        return min(
+            self.arq_sender.next_deadline(),
+            self.send_msg_queue.next_delivery_time(),
+            self.answer_msg_queue.next_delivery_time(),
+        )
+
+    def progress(self):
+        return (
+            f"{self.sender} -> {self.recipient} ({self.protocol}): "
+            f"{self.arq_sender.ans_count}/{self.packages_count}, "
+            f"sended: {len(self.posted_msgs)}, received: {len(self.received_msgs)}, "
+            f"efficiency: {self.arq_sender.efficiency():.0%}, "
+            f"RTO: {self.arq_sender.rto * 1e3:.0f} ms"
+        )
+
+    def stats(self, t):
+        # Время завершения и пропускная способность в пакетах в секунду
+        end = self.finish_time if self.finish_time is not None else t
+        duration = end - self.start_time
+        delivered = self.arq_sender.ans_count
+        return {
+            "id": self.id,
+            "sender": self.sender,
+            "recipient": self.recipient,
+            "finished": self.finish_time is not None,
+            "duration": duration,
+            "delivered": delivered,
+            "posted": len(self.posted_msgs),
+            "received": len(self.received_msgs),
+            "throughput": delivered / duration if duration > 0 else 0.0,
+            "protocol": self.protocol,
+            "retransmissions": self.arq_sender.retransmissions,
+            "efficiency": self.arq_sender.efficiency(),
+            "srtt": self.arq_sender.srtt,
+            "rto": self.arq_sender.rto,
+            "latency": self.arq_sender.mean_latency(),
+            "paths": [channel.stats() for channel in self.channels],
+        }
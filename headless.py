@@ -0,0 +1,128 @@
+import argparse
+from json import load
+
+from earth import Earth
+from flow import ARQ_PROTOCOLS
+from network import Network
+from satellite import Calculator, Satellite, elements_from_config
+from satellite_dash import SatelliteDash
+from scheduler import EventScheduler
+
+
+class HeadlessSimulation:
+    def __init__(self, config):
+        # Все объекты используют модельные часы дискретно-событийного планировщика,
+        # перед каждым событием положения спутников и Земли пересчитываются
+        self.scheduler = EventScheduler(on_advance=self.step)
+        self.clock = self.scheduler.time
+
+        self.earth = Earth(time_factor=config["time_factor"], clock=self.clock)
+
+        elements = elements_from_config(config["satellites"])
+        self.calculator = Calculator.from_elements(
+            config["time_factor"], elements, clock=self.clock
+        )
+        self.satellites = [
+            Satellite((0, 0, 0), f"s_{i}", self.calculator, *element, index=i)
+            for i, element in enumerate(elements)
+        ]
+        self.dashes = [
+            SatelliteDash(
+                f"d_{i}",
+                self.earth,
+                dash_info["lat"],
+                dash_info["long"],
+                config["sprite_size"],
+            )
+            for i, dash_info in enumerate(config["dashes"])
+        ]
+        self.calculator.update_position()
+
+        self.network = Network(
+            None,
+            self.earth,
+            self.calculator,
+            self.satellites,
+            self.dashes,
+            config["sending_interval"],
+            config["loss_probability"],
+            config["window_size"],
+            config["timeout"],
+            config["update_topology_interval"],
+            config["dash_cone_angle"],
+            max_isl_range=config["max_isl_range"],
+            contact_plan_horizon=config["contact_plan_horizon"],
+            contact_plan_step=config["contact_plan_step"],
+            scheduler=self.scheduler,
+            routing_backend=config["routing_backend"],
+            route_horizon=config["route_horizon"],
+            multipath_count=config["multipath_count"],
+            random_seed=config["random_seed"],
+            adaptive_timeout=config["adaptive_timeout"],
+            arq_protocol=config["arq_protocol"],
+        )
+        self.network.start()
+
+    def step(self):
+        self.earth.rotate()
+        self.calculator.update_position()
+
+    def run_transfers(self, transfers, max_time=3600.0):
+        # transfers - список (отправитель, получатель, число пакетов[, протокол]),
+        # все передачи начинаются одновременно и идут параллельно
+        network = self.network
+        flow_ids = [network.send(*transfer) for transfer in transfers]
+
+        start = self.scheduler.now
+        self.scheduler.run(
+            until=start + max_time,
+            stop=lambda: all(flow_id in network.flow_stats for flow_id in flow_ids),
+        )
+
+        return [network.flow_report(flow_id) for flow_id in flow_ids]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulation without a window")
+    parser.add_argument("--config", default="config.json")
+    parser.add_argument("--sender", type=int, default=0)
+    parser.add_argument("--recipient", type=int, default=1)
+    parser.add_argument("--packages", type=int, default=100)
+    parser.add_argument(
+        "--flow",
+        nargs="+",
+        action="append",
+        metavar="SENDER RECIPIENT PACKAGES [PROTOCOL]",
+        help="concurrent transfer, may be repeated",
+    )
+    parser.add_argument("--runs", type=int, default=1)
+    parser.add_argument("--max-time", type=float, default=3600.0)
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    with open(args.config, "r") as f:
+        config = load(f)
+
+    if args.seed is not None:
+        config["random_seed"] = args.seed
+
+    transfers = [(args.sender, args.recipient, args.packages)]
+    if args.flow:
+        transfers = []
+        for flow in args.flow:
+            if len(flow) not in (3, 4):
+                parser.error("--flow takes SENDER RECIPIENT PACKAGES [PROTOCOL]")
+            if len(flow) == 4 and flow[3] not in ARQ_PROTOCOLS:
+                parser.error(f"unknown protocol {flow[3]}")
+            transfers.append(tuple(int(value) for value in flow[:3]) + tuple(flow[3:]))
+
+    simulation = HeadlessSimulation(config)
+    for _ in range(args.runs):
+        for stats in simulation.run_transfers(transfers, args.max_time):
+            print(stats)
+
+    simulation.network.close()
+
+
+if __name__ == "__main__":
+    main()
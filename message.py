@@ -1,4 +1,6 @@
 import enum
+from array import array
+from collections import deque
 
 import numpy as np
 
@@ -9,47 +11,135 @@ class MessageStatus(enum.Enum):
 
 
 class Message:
-    number = -1
-    real_number = -1
-    data = ""
-    status = MessageStatus.OK
+    __slots__ = (
+        "number",
+        "real_number",
+        "ack_number",
+        "data",
+        "status",
+        "delivery_time",
+    )
 
-    def __init__(self):
-        pass
+    def __init__(self, number=-1, real_number=-1, data="", ack_number=-1):
+        self.number = number
+        self.real_number = real_number
+        # Кумулятивное подтверждение: все сообщения до этого номера включительно
+        self.ack_number = ack_number
+        self.data = data
+        self.status = MessageStatus.OK
+        self.delivery_time = 0.0
 
     def copy(self):
-        msg = Message()
-        msg.number = self.number
-        msg.data = self.data
+        msg = Message(self.number, self.real_number, self.data, self.ack_number)
         msg.status = self.status
+        msg.delivery_time = self.delivery_time
         return msg
 
 
+class MessagePool:
+    # Список свободных сообщений: обработанные сообщения возвращаются в пул
+    # и используются повторно вместо создания новых
+    def __init__(self):
+        self.free = []
+
+    def get(self, number=-1, real_number=-1, ack_number=-1):
+        if not self.free:
+            return Message(number, real_number, ack_number=ack_number)
+        msg = self.free.pop()
+        msg.number = number
+        msg.real_number = real_number
+        msg.ack_number = ack_number
+        msg.data = ""
+        msg.status = MessageStatus.OK
+        msg.delivery_time = 0.0
+        return msg
+
+    def release(self, msg):
+        self.free.append(msg)
+
+
+class MessageLog:
+    # Журнал сообщений: номер сообщения и номер слота окна в числовых массивах
+    def __init__(self):
+        self.real_numbers = array("q")
+        self.numbers = array("q")
+
+    def append(self, real_number, number):
+        self.real_numbers.append(real_number)
+        self.numbers.append(number)
+
+    def __len__(self):
+        return len(self.real_numbers)
+
+    def records(self):
+        # Массив (N, 2): номер сообщения, номер слота
+        return np.column_stack(
+            (
+                np.frombuffer(self.real_numbers, dtype=np.int64),
+                np.frombuffer(self.numbers, dtype=np.int64),
+            )
+        )
+
+
 class MsgQueue:
-    def __init__(self, loss_probability=0.3):
-        self.msg_queue = []
+    # Канал FIFO с задержкой распространения: сообщение становится доступным
+    # получателю только в момент доставки по часам clock
+    def __init__(
+        self, loss_probability=0.3, clock=None, delay=0.0, rng=None, block_size=1024
+    ):
+        self.msg_queue = deque()
         self.loss_probability = loss_probability
-        pass
+        # Решения о потере сообщений разыгрываются блоками
+        self.rng = rng if rng is not None else np.random.default_rng()
+        self.block_size = block_size
+        self.losses = np.empty(0, dtype=bool)
+        self.loss_index = 0
+        self.clock = clock
+        self.delay = delay
+        self.last_delivery_time = 0.0
+        # Статистика канала
+        self.sent = 0
+        self.lost = 0
 
     def has_msg(self):
         if len(self.msg_queue) <= 0:
             return False
-        else:
+        elif self.clock is None:
             return True
+        else:
+            return self.msg_queue[0].delivery_time <= self.clock()
+
+    def next_delivery_time(self):
+        # Время доставки ближайшего сообщения, очередь не переупорядочивается
+        if len(self.msg_queue) <= 0:
+            return np.inf
+        return self.msg_queue[0].delivery_time
 
     def get_message(self):
         if self.has_msg():
-            result = self.msg_queue[0]
-            self.msg_queue.pop(0)
-            return result
+            return self.msg_queue.popleft()
 
     def send_message(self, msg):
+        if self.clock is not None:
+            # Канал не переупорядочивает сообщения, даже если задержка уменьшилась
+            self.last_delivery_time = max(
+                self.clock() + self.delay, self.last_delivery_time
+            )
+            msg.delivery_time = self.last_delivery_time
         tmp_msg = self.emulating_channel_problems(msg)
+        self.sent += 1
+        if tmp_msg.status == MessageStatus.LOST:
+            self.lost += 1
         self.msg_queue.append(tmp_msg)
 
     def emulating_channel_problems(self, msg):
-        val = np.random.rand()
-        if val <= self.loss_probability:
+        if self.loss_index >= len(self.losses):
+            self.losses = self.rng.random(self.block_size) <= self.loss_probability
+            self.loss_index = 0
+        lost = self.losses[self.loss_index]
+        self.loss_index += 1
+
+        if lost:
             msg.status = MessageStatus.LOST
 
         return msg
@@ -1,12 +1,20 @@
-from threading import Timer
+import itertools
+import math
 
-import networkx as nx
 import numpy as np
-from networkx.algorithms.shortest_paths.generic import shortest_path
 from panda3d.core import LineSegs, LPoint3, NodePath
 
-from message import MsgQueue
-from protocol_srp import SRP_receiver, SRP_sender
+from contact_plan import ContactPlan
+from flow import Flow
+from routing import ROUTING_BACKENDS
+from satellite_dash import local_positions
+from scheduler import TimerScheduler
+from topology import (
+    SPEED_OF_LIGHT,
+    Topology,
+    dash_visibility,
+    satellite_visibility,
+)
 
 
 class Network:
@@ -14,6 +22,7 @@ class Network:
         self,
         parent,
         earth,
+        calculator,
         satellites,
         dashes,
         sending_interval=0.1,
@@ -24,287 +33,446 @@ class Network:
         dash_cone_angle=60,
         path_color=(0, 1, 0, 0.8),
         path_thickness=1.5,
+        max_isl_range=None,
+        contact_plan_horizon=None,
+        contact_plan_step=0.1,
+        scheduler=None,
+        routing_backend="csgraph",
+        route_horizon=None,
+        multipath_count=1,
+        random_seed=None,
+        adaptive_timeout=True,
+        arq_protocol="srp",
     ):
         self.parent = parent
         self.earth = earth
+        self.calculator = calculator
 
         self.lines = []
-        self.graph = nx.Graph()
-        self.sender = None
-        self.recipient = None
-        self.path = []
-
-        self.srp_sender = None
-        self.srp_reciever = None
-        self.send_msg_queue = None
-        self.answer_msg_queue = None
-        self.posted_msgs = None
-        self.received_msgs = None
+
+        # Таблица активных передач и статистика завершенных по номеру потока
+        self.flows = {}
+        self.flow_ids = itertools.count()
+        self.flow_stats = {}
 
         self.set_progress_callback = None
 
         self.update_interval = update_interval
         self.sending_interval = sending_interval
         self.loss_probability = loss_probability
+        # Общий генератор потерь сообщений во всех каналах
+        self.rng = np.random.default_rng(random_seed)
         self.window_size = window_size
         self.timeout = timeout
+        self.adaptive_timeout = adaptive_timeout
+        self.arq_protocol = arq_protocol
 
         self.path_color = path_color
         self.path_thickness = path_thickness
 
-        self.dash_cone_cos2 = np.cos(np.radians(dash_cone_angle))
+        self.topology = Topology(self.earth.radius, dash_cone_angle, max_isl_range)
+
+        self.contact_plan = None
+        self.contact_plan_horizon = contact_plan_horizon
+        self.contact_plan_step = contact_plan_step
+
+        # Ожидаемая длительность передачи, на которую выбираются устойчивые пути
+        self.route_horizon = route_horizon
+
+        # Число путей без общих ребер, по которым распределяется каждый поток
+        self.multipath_count = multipath_count
 
+        # Порядок спутников совпадает с порядком их элементов в калькуляторе
         self.satellites = {}
-        for satellite in satellites:
+        for satellite in sorted(satellites, key=lambda satellite: satellite.index):
             self.satellites[satellite.id] = satellite
-            self.graph.add_node(satellite.id)
+        self.satellite_ids = list(self.satellites)
 
         self.dashes = {}
         for dash in dashes:
             self.dashes[dash.id] = dash
-            self.graph.add_node(dash.id)
-
-        self.topology_timer = Timer(self.update_interval, self.update_topology)
-        self.topology_timer.start()
-
+        self.dash_ids = list(self.dashes)
+
+        self.dash_lat = np.array([dash.lat for dash in dashes], dtype=np.float64)
+        self.dash_long = np.array([dash.long for dash in dashes], dtype=np.float64)
+        self.dash_radius = np.array([dash.radius for dash in dashes], dtype=np.float64)
+
+        # Ребро (u, v), u < v, кодируется числом u * n + v по номерам вершин
+        self.node_ids = np.array(self.dash_ids + self.satellite_ids, dtype=object)
+        self.node_index = {node_id: i for i, node_id in enumerate(self.node_ids)}
+        self.edge_keys = np.empty(0, dtype=np.int64)
+
+        # Кратчайшие пути между всеми станциями, общие для всех потоков
+        self.routing = ROUTING_BACKENDS[routing_backend](self.node_ids, self.dash_ids)
+
+        # Статистика обновлений топологии
+        self.topology_ticks = 0
+        self.noop_topology_ticks = 0
+        self.path_recomputations = 0
+        self.path_invalidations = 0
+
+        # По умолчанию события выполняются по таймерам в реальном времени
+        self.scheduler = scheduler if scheduler is not None else TimerScheduler()
+        self.clock = self.scheduler.time
+        self.running = False
+        self.topology_timer = None
         self.sending_timer = None
+        self.sending_time = None
 
-    def send(self, sender, recipient, packages_count):
-        if self.sending_timer:
-            self.sending_timer.cancel()
+    def start(self):
+        # Запуск периодического обновления топологии и передачи через планировщик
+        self.running = True
+        self.topology_timer = self.scheduler.call_later(
+            self.update_interval, self.update_topology
+        )
 
-        self.sender = f"d_{sender}"
-        self.recipient = f"d_{recipient}"
+    def send(self, sender, recipient, packages_count, protocol=None):
+        # Новая передача добавляется в таблицу потоков, остальные продолжаются,
+        # протокол передачи по умолчанию задается при создании сети.
+        # Поток между несуществующими станциями никогда бы не завершился
+        sender = f"d_{sender}"
+        recipient = f"d_{recipient}"
+        for dash_id in (sender, recipient):
+            if dash_id not in self.dashes:
+                raise ValueError(f"Unknown station {dash_id}")
+
+        flow = Flow(
+            next(self.flow_ids),
+            sender,
+            recipient,
+            packages_count,
+            self.window_size,
+            self.timeout,
+            self.loss_probability,
+            self.clock,
+            self.multipath_count,
+            self.rng,
+            self.adaptive_timeout,
+            # Наименьший запас срока повтора сверх оценки времени оборота
+            self.sending_interval,
+            protocol if protocol is not None else self.arq_protocol,
+        )
+        self.flows[flow.id] = flow
 
-        print(f"Start sending from {self.sender} to {self.recipient}")
+        print(f"Start sending flow {flow.id} from {flow.sender} to {flow.recipient}")
+        self.report_progress()
 
-        self.send_msg_queue = MsgQueue(self.loss_probability)
-        self.answer_msg_queue = MsgQueue(self.loss_probability)
-        self.posted_msgs = []
-        self.received_msgs = []
+        self.schedule_transmit(self.clock())
+        return flow.id
 
-        self.srp_sender = SRP_sender(
-            self.answer_msg_queue,
-            self.send_msg_queue,
-            self.posted_msgs,
-            self.window_size,
-            packages_count,
-            self.timeout,
+    def schedule_transmit(self, t):
+        # Передача назначается на момент t, если она не назначена на более ранний
+        if not self.running or t == np.inf:
+            return
+        if self.sending_timer is not None:
+            if self.sending_time <= t:
+                return
+            self.sending_timer.cancel()
+        self.sending_time = t
+        self.sending_timer = self.scheduler.call_later(
+            max(0.0, t - self.clock()), self._send
         )
-        self.srp_reciever = SRP_receiver(
-            self.answer_msg_queue, self.send_msg_queue, self.received_msgs
+
+    def _send(self):
+        self.sending_timer = None
+        if not self.transmit():
+            return
+
+        # Следующая передача - к ближайшему событию потоков: доставке сообщения
+        # или подтверждения либо истечению срока повтора. События в пределах
+        # одного такта обрабатываются вместе, такты без событий пропускаются
+        t = self.clock()
+        next_time = self.next_event_time()
+        if next_time == np.inf:
+            return
+        ticks = max(1, math.ceil((next_time - t) / self.sending_interval))
+        self.schedule_transmit(t + ticks * self.sending_interval)
+
+    def next_event_time(self):
+        # Потоки без пути ждут пересчета маршрутов, который их и разбудит
+        return min(
+            (flow.next_event_time() for flow in self.flows.values() if flow.paths),
+            default=np.inf,
         )
 
+    def transmit(self):
+        # Один шаг передачи для всех активных потоков,
+        # возвращает True, пока остаются незавершенные потоки.
+        # Положения вершин вычисляются один раз для всех потоков
+        positions = self.node_positions()
+        for flow in list(self.flows.values()):
+            self.check_path(flow, positions)
+            if len(flow.paths) > 0:
+                flow.tick()
+            if flow.is_finished():
+                self.finish(flow)
+
+        self.report_progress()
+        return len(self.flows) > 0
+
+    def finish(self, flow):
+        flow.finish_time = self.clock()
+        stats = flow.stats(flow.finish_time)
+        self.flow_stats[flow.id] = stats
+        del self.flows[flow.id]
+
+        print(
+            f"Sending flow {flow.id} ({flow.protocol}) "
+            f"from {flow.sender} to {flow.recipient} "
+            f"finished in {stats['duration']:.2f} s"
+        )
+        print("Posted: ", stats["posted"])
+        print("Recived: ", stats["received"])
+        print(f"Throughput: {stats['throughput']:.2f} packages/s")
+        print(f"Retransmission efficiency: {stats['efficiency']:.1%}")
+        print(f"Mean latency: {stats['latency'] * 1e3:.0f} ms")
+
+    def flow_report(self, flow_id):
+        # Статистика потока: итоговая для завершенного, текущая для активного
+        if flow_id in self.flow_stats:
+            return self.flow_stats[flow_id]
+        return self.flows[flow_id].stats(self.clock())
+
+    def report_progress(self):
         if self.set_progress_callback:
             self.set_progress_callback(
-                f"Packages: 0/{packages_count}.\nSended: {0}.\nReceived: {0}"
+                "\n".join(flow.progress() for flow in list(self.flows.values()))
             )
 
-        self.sending_timer = Timer(self.sending_interval, self._send)
-        self.sending_timer.start()
-
-    def _send(self):
-        self.check_path()
-
-        if len(self.path) > 0:
-            self.srp_sender.send()
-            self.srp_reciever.receive()
-            if self.set_progress_callback:
-                self.set_progress_callback(
-                    f"Packages: {self.srp_sender.ans_count}/{self.srp_sender.max_number}.\nSended: {len(self.posted_msgs)}.\nReceived: {len(self.received_msgs)}"
-                )
-
-        if not self.srp_sender.is_finished():
-            self.sending_timer = Timer(self.sending_interval, self._send)
-            self.sending_timer.start()
-        else:
-            print(f"Sending from {self.sender} to {self.recipient} finished")
-            print("Posted: ", len(self.posted_msgs))
-            print("Recived: ", len(self.received_msgs))
-            self.sender = None
-            self.recipient = None
-            self.srp_sender = None
-            self.srp_reciever = None
-            self.send_msg_queue = None
-            self.answer_msg_queue = None
-            self.posted_msgs = None
-            self.received_msgs = None
-            if self.set_progress_callback:
-                self.set_progress_callback("")
-
     def close(self):
-        self.topology_timer.cancel()
+        print(
+            f"Topology updates: {self.topology_ticks}, "
+            f"without changes: {self.noop_topology_ticks}, "
+            f"path recomputations: {self.path_recomputations}, "
+            f"path invalidations: {self.path_invalidations}"
+        )
+        if self.topology_timer:
+            self.topology_timer.cancel()
         if self.sending_timer:
             self.sending_timer.cancel()
 
+    def dash_positions(self):
+        # Координаты станций относительно центра Земли, массив (D, 3)
+        return local_positions(
+            self.dash_lat, self.dash_long, self.dash_radius, self.earth.angle
+        ).reshape(-1, 3)
+
+    def satellite_positions(self):
+        # Координаты спутников относительно центра Земли, массив (S, 3)
+        return self.calculator.positions()
+
+    def node_positions(self):
+        # Координаты всех вершин в порядке их номеров, массив (D + S, 3)
+        return np.vstack((self.dash_positions(), self.satellite_positions()))
+
     def update_topology(self):
-        self.graph.clear_edges()
-
-        processed = set()
-        for dash_id, dash in self.dashes.items():
-            for satellite_id, satellite in self.satellites.items():
-                p1 = dash.pos
-                p2 = satellite.pos
-                e1 = [
-                    p1[0] - self.earth.model.getX(),
-                    p1[1] - self.earth.model.getY(),
-                    p1[2] - self.earth.model.getZ(),
-                ]
-                e2 = [p2[0] - p1[0], p2[1] - p1[1], p2[2] - p1[2]]
-                cos2 = (e1[0] * e2[0] + e1[1] * e2[1] + e1[2] * e2[2]) / np.sqrt(
-                    (e1[0] * e1[0] + e1[1] * e1[1] + e1[2] * e1[2])
-                    * (e2[0] * e2[0] + e2[1] * e2[1] + e2[2] * e2[2])
-                )
-                if cos2 > self.dash_cone_cos2:
-                    self.graph.add_edge(dash_id, satellite_id)
-        for cur_satellite_id, cur_satellite in self.satellites.items():
-            for satellite_id, satellite in self.satellites.items():
-                if cur_satellite_id == satellite_id or satellite_id in processed:
-                    continue
-
-                p1 = cur_satellite.pos
-                p2 = satellite.pos
-                e3 = [(p2[0] - p1[0]), (p2[1] - p1[1]), (p2[2] - p1[2])]
-                e3_mod2 = e3[0] ** 2 + e3[1] ** 2 + e3[2] ** 2
-                e1 = [
-                    (p1[0] - self.earth.model.getX()),
-                    (p1[1] - self.earth.model.getY()),
-                    (p1[2] - self.earth.model.getZ()),
-                ]
-                e1_mod2 = e1[0] ** 2 + e1[1] ** 2 + e1[2] ** 2
-
-                cos_beta_2 = (e1[0] * e3[0] + e1[1] * e3[1] + e1[2] * e3[2]) ** 2 / (
-                    e1_mod2 * e3_mod2
-                )
+        t = self.clock()
+        self.refresh_topology(t)
+        self.topology_timer = self.scheduler.call_later(
+            self.next_topology_update(t), self.update_topology
+        )
 
-                cos_alpha_2 = self.earth.radius / e1_mod2
-
-                if cos_beta_2 < cos_alpha_2:
-                    self.graph.add_edge(cur_satellite_id, satellite_id)
-
-            processed.add(cur_satellite_id)
-
-        if self.sender and self.recipient:
-            self.path = self.get_shortest_path()
-
-        self.topology_timer = Timer(self.update_interval, self.update_topology)
-        self.topology_timer.start()
-
-    def weight(self, node1, node2, attrs):
-        if node1 in self.dashes:
-            p1 = self.dashes[node1].pos
-            p2 = self.satellites[node2].pos
-        elif node2 in self.dashes:
-            p1 = self.dashes[node2].pos
-            p2 = self.satellites[node1].pos
-        else:
-            p1 = self.satellites[node1].pos
-            p2 = self.satellites[node2].pos
-        weight = (p2[0] - p1[0]) ** 2 + (p2[1] - p1[1]) ** 2 + (p2[2] - p1[2]) ** 2
-        return weight
-
-    def get_shortest_path(self):
-        try:
-            return shortest_path(self.graph, self.sender, self.recipient, self.weight)
-        except:
-            return []
-
-    def check_path(self):
-        if len(self.path) < 3 or not self.sender or not self.recipient:
-            self.path = []
-            return
+    def refresh_topology(self, t):
+        edge_keys = self.current_edge_keys(t)
+
+        # Маршруты пересчитываются только при изменении набора связей
+        added = np.setdiff1d(edge_keys, self.edge_keys, assume_unique=True)
+        removed = np.setdiff1d(self.edge_keys, edge_keys, assume_unique=True)
+        self.edge_keys = edge_keys
+
+        self.topology_ticks += 1
+        if added.size == 0 and removed.size == 0:
+            self.noop_topology_ticks += 1
+        elif self.changes_routes(added, removed):
+            self.routing.invalidate()
+
+        self.update_routes()
+
+    def changes_routes(self, added, removed):
+        # Вес нового ребра без штрафа за время жизни не больше его веса
+        # при построении маршрутов, поэтому проверка не пропустит улучшений
+        n = len(self.node_ids)
+        u = added // n
+        v = added % n
+        positions = self.node_positions()
+        weights = np.sum((positions[v] - positions[u]) ** 2, axis=1)
+        return self.routing.changes_routes(u, v, weights, removed)
+
+    def current_edge_keys(self, t):
+        if self.contact_plan_horizon is None:
+            return self.topology.edge_keys(
+                self.dash_positions(), self.satellite_positions()
+            )
+
+        # План контактов перестраивается, когда заканчивается его горизонт
+        # или меняется скорость течения модельного времени
+        if self.contact_plan is None or not self.contact_plan.covers(
+            t + self.update_interval
+        ):
+            self.contact_plan = ContactPlan(
+                self.topology,
+                self.calculator,
+                self.earth,
+                self.dashes.values(),
+                t,
+                self.contact_plan_horizon,
+                self.contact_plan_step,
+            )
+        return self.contact_plan.edge_keys_at(t)
+
+    def next_topology_update(self, t):
+        if self.contact_plan is None:
+            return self.update_interval
+        # Обновляем топологию ровно в момент ближайшего изменения связей
+        delay = self.contact_plan.next_change(t) - self.clock()
+        return max(0.0, min(self.update_interval, delay))
+
+    def update_routes(self):
+        # Таблицы пересчитываются только после изменения связей или обрыва пути
+        flows = list(self.flows.values())
+        if len(flows) > 0 and self.routing.stale:
+            self.update_routing()
+            self.path_recomputations += 1
+
+        positions = self.node_positions()
+        woken = False
+        for flow in flows:
+            waiting = len(flow.paths) == 0
+            if len(flow.channels) == 1:
+                paths = [self.routing.path(flow.sender, flow.recipient)]
+            else:
+                paths = self.routing.disjoint_paths(
+                    flow.sender, flow.recipient, len(flow.channels)
+                )
 
-        dash_id = self.path[0]
-        satellite_id = self.path[1]
-        dash = self.dashes[dash_id]
-        satellite = self.satellites[satellite_id]
-        p1 = dash.pos
-        p2 = satellite.pos
-        e1 = [
-            p1[0] - self.earth.model.getX(),
-            p1[1] - self.earth.model.getY(),
-            p1[2] - self.earth.model.getZ(),
-        ]
-        e2 = [p2[0] - p1[0], p2[1] - p1[1], p2[2] - p1[2]]
-        cos2 = (e1[0] * e2[0] + e1[1] * e2[1] + e1[2] * e2[2]) / np.sqrt(
-            (e1[0] * e1[0] + e1[1] * e1[1] + e1[2] * e1[2])
-            * (e2[0] * e2[0] + e2[1] * e2[1] + e2[2] * e2[2])
+            # Пути, которых не нашлось, остаются пустыми
+            for i, channel in enumerate(flow.channels):
+                path = paths[i] if i < len(paths) else []
+                channel.set_path(path, self.path_latency(path, positions))
+            woken = woken or (waiting and len(flow.paths) > 0)
+
+        # Потокам, у которых появился путь, передача нужна сразу
+        if woken:
+            self.schedule_transmit(self.clock())
+
+    def path_latency(self, path, positions):
+        # Задержка распространения сигнала по пути
+        if len(path) < 2:
+            return 0.0
+        points = positions[[self.node_index[node_id] for node_id in path]]
+        length = np.sum(np.linalg.norm(np.diff(points, axis=0), axis=1))
+        return float(length / SPEED_OF_LIGHT)
+
+    def update_routing(self):
+        # Вес ребра - квадрат расстояния между его вершинами
+        n = len(self.node_ids)
+        u = self.edge_keys // n
+        v = self.edge_keys % n
+        positions = self.node_positions()
+        weights = np.sum((positions[v] - positions[u]) ** 2, axis=1)
+
+        if self.route_horizon is not None and weights.size > 0:
+            # Пути сравниваются лексикографически: сначала по числу связей,
+            # пропадающих раньше горизонта, затем по суммарной доле недожитого
+            # ими горизонта и только потом по длине. Шаг total больше длины
+            # любого пути, а сумма долей по простому пути меньше n
+            lifetimes = self.link_lifetimes(self.clock())
+            shortfall = 1 - lifetimes / self.route_horizon
+            total = weights.sum() + 1
+            weights = weights + total * (shortfall + n * (shortfall > 0))
+
+        self.routing.update(u, v, weights)
+
+    def link_lifetimes(self, t):
+        # Оставшееся время существования текущих связей, не больше route_horizon
+        horizon = self.route_horizon
+        if self.contact_plan is not None and self.contact_plan.covers(t):
+            return self.contact_plan.remaining_lifetimes(self.edge_keys, t, horizon)
+
+        # Без плана контактов проверяем видимость по будущим положениям вершин
+        step = self.contact_plan_step
+        times = t + step * np.arange(1, int(np.ceil(horizon / step)) + 1)
+        dash_pos = local_positions(
+            self.dash_lat,
+            self.dash_long,
+            self.dash_radius,
+            self.earth.angle_at(times)[:, np.newaxis],
+        )
+        satellite_pos = self.calculator.propagate(times).transpose(1, 0, 2)
+        positions = np.concatenate((dash_pos, satellite_pos), axis=1)
+
+        n = len(self.node_ids)
+        u = self.edge_keys // n
+        v = self.edge_keys % n
+        visible = self.topology.pair_visibility(
+            positions[:, u], positions[:, v], u < len(self.dash_ids)
         )
-        if cos2 <= self.dash_cone_cos2:
-            self.path = []
-            return
 
-        dash_id = self.path[-1]
-        satellite_id = self.path[-2]
-        dash = self.dashes[dash_id]
-        satellite = self.satellites[satellite_id]
-        p1 = dash.pos
-        p2 = satellite.pos
-        e1 = [
-            p1[0] - self.earth.model.getX(),
-            p1[1] - self.earth.model.getY(),
-            p1[2] - self.earth.model.getZ(),
-        ]
-        e2 = [p2[0] - p1[0], p2[1] - p1[1], p2[2] - p1[2]]
-        cos2 = (e1[0] * e2[0] + e1[1] * e2[1] + e1[2] * e2[2]) / np.sqrt(
-            (e1[0] * e1[0] + e1[1] * e1[1] + e1[2] * e1[2])
-            * (e2[0] * e2[0] + e2[1] * e2[1] + e2[2] * e2[2])
+        # Время последнего момента сетки, до которого связь не пропадала
+        broken = ~visible
+        first_broken = np.argmax(broken, axis=0)
+        return np.where(
+            np.any(broken, axis=0), np.minimum(first_broken * step, horizon), horizon
         )
-        if cos2 <= self.dash_cone_cos2:
-            self.path = []
+
+    def invalidate_path(self, channel):
+        # Таблицы маршрутов пересчитываются при следующем обновлении топологии
+        channel.path = []
+        self.routing.invalidate()
+        self.path_invalidations += 1
+
+    def check_path(self, flow, positions):
+        for channel in flow.channels:
+            self.check_channel(channel, positions)
+
+    def check_channel(self, channel, positions):
+        path = channel.path
+        if len(path) < 3:
+            channel.path = []
             return
 
-        for i in range(1, len(self.path) - 2):
-            cur_satellite_id = self.path[i]
-            satellite_id = self.path[i + 1]
-            cur_satellite = self.satellites[cur_satellite_id]
-            satellite = self.satellites[satellite_id]
-            p1 = cur_satellite.pos
-            p2 = satellite.pos
-            e3 = [(p2[0] - p1[0]), (p2[1] - p1[1]), (p2[2] - p1[2])]
-            e3_mod2 = e3[0] ** 2 + e3[1] ** 2 + e3[2] ** 2
-            e1 = [
-                (p1[0] - self.earth.model.getX()),
-                (p1[1] - self.earth.model.getY()),
-                (p1[2] - self.earth.model.getZ()),
-            ]
-            e1_mod2 = e1[0] ** 2 + e1[1] ** 2 + e1[2] ** 2
-
-            cos_beta_2 = (e1[0] * e3[0] + e1[1] * e3[1] + e1[2] * e3[2]) ** 2 / (
-                e1_mod2 * e3_mod2
-            )
+        points = positions[[self.node_index[node_id] for node_id in path]]
 
-            cos_alpha_2 = self.earth.radius / e1_mod2
+        # Проверяем связь крайних станций со спутниками
+        dashes = points[[0, -1]]
+        satellites = points[[1, -2]]
+        if not np.all(dash_visibility(dashes, satellites, self.topology.dash_cone_cos)):
+            self.invalidate_path(channel)
+            return
 
-            if cos_beta_2 >= cos_alpha_2:
-                self.path = []
-                return
+        # Проверяем прямую видимость между соседними спутниками на пути
+        if not np.all(
+            satellite_visibility(points[1:-2], points[2:-1], self.earth.radius)
+        ):
+            self.invalidate_path(channel)
+            return
 
     def _update(self):
         for line in self.lines:
             line.remove_node()
 
         self.lines = []
-        self.check_path()
 
-        if len(self.path) == 0:
+        positions = self.node_positions()
+        paths = []
+        for flow in list(self.flows.values()):
+            self.check_path(flow, positions)
+            paths.extend(flow.paths)
+
+        if len(paths) == 0:
             return
 
         ls = LineSegs()
         ls.set_color(*self.path_color)
         ls.set_thickness(self.path_thickness)
 
-        points = []
-        for i in range(len(self.path)):
-            if i == 0 or i == len(self.path) - 1:
-                p = self.dashes[self.path[i]].pos
-            else:
-                p = self.satellites[self.path[i]].pos
-            points.append(p)
-
-        # Рисуем путь
-        for x, y, z in points:
-            ls.draw_to(LPoint3(x, y, z))
+        # Рисуем пути всех потоков одним набором линий
+        for path in paths:
+            points = positions[[self.node_index[node_id] for node_id in path]]
+            x, y, z = points[0]
+            ls.move_to(LPoint3(x, y, z))
+            for x, y, z in points[1:]:
+                ls.draw_to(LPoint3(x, y, z))
 
         # Создаем NodePath для пути
         node = ls.create()
@@ -317,7 +485,7 @@ class Network:
         line.reparent_to(self.parent)
 
         # Устанавливаем позицию пути относительно сцены
-        line.set_pos(self.earth.model.getPos())
+        line.set_pos(*self.earth.center())
 
         self.lines.append(line)
 
@@ -0,0 +1,119 @@
+import numpy as np
+from panda3d.core import (
+    Geom,
+    GeomLinestrips,
+    GeomNode,
+    GeomVertexArrayFormat,
+    GeomVertexData,
+    GeomVertexFormat,
+    NodePath,
+)
+
+
+def plane_colors(calculator, palette):
+    # Цвета спутников по орбитальным плоскостям: плоскость задается
+    # наклонением и долготой восходящего узла
+    planes = np.round(np.hstack((calculator.i, calculator.omega)), 9)
+    _, plane_index = np.unique(planes, axis=0, return_inverse=True)
+    palette = np.asarray(palette, dtype=np.float32).reshape(-1, 4)
+    return palette[plane_index.ravel() % len(palette)]
+
+
+class OrbitTracks:
+    def __init__(
+        self,
+        parent,
+        calculator,
+        pos_shift=(0, 0, 0),
+        num_segments=1000,
+        colors=(1, 1, 1, 0.8),
+        thickness=1.5,
+        max_vertices=1 << 20,
+    ):
+        count = calculator.a.shape[0]
+
+        # Спутники с одинаковыми a, e, i, omega, w летят по одному эллипсу,
+        # поэтому каждая траектория строится один раз
+        elements = np.hstack(
+            (calculator.a, calculator.e, calculator.i, calculator.omega, calculator.w)
+        )
+        _, first, self.track_index = np.unique(
+            elements, axis=0, return_index=True, return_inverse=True
+        )
+        self.track_index = self.track_index.ravel()
+        self.track_count = len(first)
+        self.track_length = num_segments + 1
+
+        points = calculator.orbit_points(num_segments, first)
+        colors = np.asarray(colors, dtype=np.float32)
+        colors = np.broadcast_to(colors, (count, 4))[first]
+
+        # Вершины (координаты и цвет) траекторий хранятся в нескольких
+        # больших буферах, каждый рисуется одним вызовом
+        array_format = GeomVertexArrayFormat()
+        array_format.add_column("vertex", 3, Geom.NT_float32, Geom.C_point)
+        array_format.add_column("color", 4, Geom.NT_float32, Geom.C_color)
+        vertex_format = GeomVertexFormat.register_format(GeomVertexFormat(array_format))
+
+        self.tracks_per_geom = max(1, max_vertices // self.track_length)
+        self.geom_node = GeomNode("orbit_tracks")
+        for start in range(0, self.track_count, self.tracks_per_geom):
+            stop = min(start + self.tracks_per_geom, self.track_count)
+            rows = (stop - start) * self.track_length
+
+            data = np.empty((rows, 7), dtype=np.float32)
+            data[:, :3] = points[start:stop].reshape(-1, 3)
+            data[:, 3:] = np.repeat(colors[start:stop], self.track_length, axis=0)
+
+            vdata = GeomVertexData("orbit_tracks", vertex_format, Geom.UH_static)
+            vdata.unclean_set_num_rows(rows)
+            memoryview(vdata.modify_array(0)).cast("B").cast("f")[:] = data.ravel()
+
+            geom = Geom(vdata)
+            geom.add_primitive(self.strips(np.arange(stop - start)))
+            self.geom_node.add_geom(geom)
+
+        self.visible = np.ones(count, dtype=bool)
+
+        self.node = NodePath(self.geom_node)
+        self.node.set_render_mode_thickness(thickness)  # Толщина линии
+
+        # Отключаем освещение для орбит
+        self.node.setLightOff()
+
+        # Прикрепляем орбиты к сцене
+        self.node.reparent_to(parent)
+
+        # Устанавливаем позицию орбит относительно сцены
+        self.node.set_pos(*pos_shift)
+
+    def strips(self, tracks):
+        # Примитив из ломаных с номерами tracks внутри одного буфера
+        strips = GeomLinestrips(Geom.UH_static)
+        for track in tracks.tolist():
+            strips.add_consecutive_vertices(
+                track * self.track_length, self.track_length
+            )
+            strips.close_primitive()
+        return strips
+
+    def set_visible(self, index, visible=True):
+        # Показать или скрыть траектории спутников с номерами index
+        self.visible[index] = visible
+
+        # Траектория видна, если видим хотя бы один спутник на ней
+        tracks = np.zeros(self.track_count, dtype=bool)
+        tracks[self.track_index[self.visible]] = True
+
+        changed = np.unique(self.track_index[index] // self.tracks_per_geom)
+        for geom_number in changed.tolist():
+            start = geom_number * self.tracks_per_geom
+            stop = min(start + self.tracks_per_geom, self.track_count)
+            geom = self.geom_node.modify_geom(geom_number)
+            geom.set_primitive(0, self.strips(np.flatnonzero(tracks[start:stop])))
+
+    def show_all(self):
+        self.set_visible(slice(None), True)
+
+    def hide_all(self):
+        self.set_visible(slice(None), False)
@@ -0,0 +1,119 @@
+import numpy as np
+
+from arq import ARQ_receiver, ARQ_sender
+from message import MessageStatus
+
+
+class GBN_sender(ARQ_sender):
+    # Go-Back-N: один таймер на самое старое неподтвержденное сообщение,
+    # по его истечении повторяется все окно начиная с него
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        window_size = self.window_size
+
+        self.base = 0  # Самое старое неподтвержденное сообщение
+        self.next_number = 0  # Следующее сообщение к отправке
+        self.deadline = None
+
+        # Время первой и последней отправки и число отправок
+        # по номеру сообщения по модулю размера окна
+        self.first_send_time = np.zeros(window_size)
+        self.send_time = np.zeros(window_size)
+        self.transmissions = np.zeros(window_size, dtype=np.int64)
+
+    def send(self):
+        if self.ans_count >= self.max_number:
+            return
+
+        curr_time = self.clock()
+
+        # подтверждения кумулятивные, достаточно самого большого
+        ack_number = -1
+        while self.answer_msg_queue.has_msg():
+            ans = self.answer_msg_queue.get_message()
+            if ans.status != MessageStatus.LOST:
+                ack_number = max(ack_number, ans.ack_number)
+            self.pool.release(ans)
+        if ack_number >= self.base:
+            self.acknowledge(ack_number, curr_time)
+
+        # истек срок самого старого сообщения: возвращаемся к нему
+        if self.deadline is not None and self.deadline <= curr_time:
+            self.next_number = self.base
+            self.deadline = None
+            self.back_off(self.send_time[self.base % self.window_size], curr_time)
+
+        self.transmit(curr_time)
+
+    def next_deadline(self):
+        return self.deadline if self.deadline is not None else np.inf
+
+    def acknowledge(self, ack_number, curr_time):
+        slots = np.arange(self.base, ack_number + 1) % self.window_size
+        last = ack_number % self.window_size
+        # правило Карна: время оборота измеряется только без повторов
+        if self.adaptive_timeout and self.transmissions[last] == 1:
+            self.update_rtt(float(curr_time - self.send_time[last]))
+        self.latency_sum += float(np.sum(curr_time - self.first_send_time[slots]))
+        self.transmissions[slots] = 0
+        self.reset_backoff()
+
+        self.ans_count += ack_number + 1 - self.base
+        self.base = ack_number + 1
+        self.restart_timer(curr_time)
+
+    def restart_timer(self, curr_time):
+        if self.base >= self.next_number:
+            self.deadline = None
+            return
+        self.deadline = curr_time + self.retransmission_timeout()
+
+    def transmit(self, curr_time):
+        stop = min(self.base + self.window_size, self.max_number)
+        if self.next_number >= stop:
+            return
+
+        numbers = np.arange(self.next_number, stop)
+        slots = numbers % self.window_size
+        repeat = self.transmissions[slots] > 0
+        self.retransmissions += int(np.count_nonzero(repeat))
+        self.sent_count += len(slots)
+        self.first_send_time[slots[~repeat]] = curr_time
+        self.transmissions[slots] += 1
+        self.send_time[slots] = curr_time
+
+        for i, number in zip(slots.tolist(), numbers.tolist()):
+            self.send_msg_queue.send_message(self.pool.get(i, number))
+            self.posted_msgs.append(number, i)
+
+        self.next_number = stop
+        if self.deadline is None:
+            self.restart_timer(curr_time)
+
+
+class GBN_receiver(ARQ_receiver):
+    # Принимаются только сообщения по порядку, остальные отбрасываются
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.expected = 0
+
+    def receive(self):
+        while self.send_msg_queue.has_msg():
+            curr_msg = self.send_msg_queue.get_message()
+
+            if curr_msg.status == MessageStatus.LOST:
+                self.pool.release(curr_msg)
+                continue
+
+            # как и в остальных протоколах, учитывается каждое дошедшее
+            # сообщение, в том числе отброшенные не по порядку и повторы
+            self.received_msgs.append(curr_msg.real_number, curr_msg.number)
+            if curr_msg.real_number == self.expected:
+                self.expected += 1
+
+            # подтверждаем последнее сообщение, принятое по порядку
+            if self.expected > 0:
+                self.answer_msg_queue.send_message(
+                    self.pool.get(curr_msg.number, self.expected - 1, self.expected - 1)
+                )
+            self.pool.release(curr_msg)
@@ -0,0 +1,56 @@
+import numpy as np
+
+from arq import ARQ_receiver
+from message import MessageStatus
+from protocol_srp import SRP_sender, unique_slots
+
+
+class SACK_sender(SRP_sender):
+    # Выборочный повтор с кумулятивными подтверждениями: каждое подтверждение
+    # закрывает свое сообщение и все сообщения до кумулятивного номера,
+    # поэтому потерянное подтверждение не вызывает лишнего повтора
+    def process_acks(self, acks, curr_time):
+        slots, numbers = acks[:, 0], acks[:, 1]
+        selective = unique_slots(
+            slots[
+                (self.status[slots] != SRP_sender.CAN_BE_USED)
+                & (self.number[slots] == numbers)
+            ]
+        )
+        cumulative = np.flatnonzero(
+            (self.status != SRP_sender.CAN_BE_USED) & (self.number <= acks[:, 2].max())
+        )
+        # время оборота измеряется только по выборочным подтверждениям,
+        # кумулятивное могло прийти намного позже своего сообщения
+        self.acknowledge(
+            unique_slots(np.concatenate((selective, cumulative))),
+            curr_time,
+            selective,
+        )
+
+
+class SACK_receiver(ARQ_receiver):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.expected = 0  # Первое еще не принятое сообщение
+        self.buffered = set()  # Принятые сообщения после него
+
+    def receive(self):
+        while self.send_msg_queue.has_msg():
+            curr_msg = self.send_msg_queue.get_message()
+
+            if curr_msg.status == MessageStatus.LOST:
+                self.pool.release(curr_msg)
+                continue
+
+            if curr_msg.real_number >= self.expected:
+                self.buffered.add(curr_msg.real_number)
+                while self.expected in self.buffered:
+                    self.buffered.remove(self.expected)
+                    self.expected += 1
+
+            self.answer_msg_queue.send_message(
+                self.pool.get(curr_msg.number, curr_msg.real_number, self.expected - 1)
+            )
+            self.received_msgs.append(curr_msg.real_number, curr_msg.number)
+            self.pool.release(curr_msg)
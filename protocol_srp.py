@@ -1,110 +1,161 @@
-import enum
-import time
-
-from message import Message, MessageStatus
-
-
-class SRP_sender:
-    class WndMsgStatus(enum.Enum):
-        BUSY = enum.auto()
-        NEED_REPEAT = enum.auto()
-        CAN_BE_USED = enum.auto()
-
-    class WndNode:
-        def __init__(self, number):
-            self.status = SRP_sender.WndMsgStatus.NEED_REPEAT
-            self.time = 0
-            self.number = number
-            pass
-
-    def __init__(
-        self,
-        answer_msg_queue,
-        send_msg_queue,
-        posted_msgs,
-        window_size,
-        max_number,
-        timeout,
-    ):
-        self.answer_msg_queue = answer_msg_queue
-        self.send_msg_queue = send_msg_queue
-        self.posted_msgs = posted_msgs
-        self.window_size = window_size
-        self.max_number = max_number
-        self.timeout = timeout
-        self.wnd_nodes = [SRP_sender.WndNode(i) for i in range(window_size)]
-        self.ans_count = 0
+import heapq
+from collections import deque
 
-    def send(self):
-        if self.ans_count < self.max_number:
-            if self.answer_msg_queue.has_msg():
-                ans = self.answer_msg_queue.get_message()
-                self.ans_count += 1
-                self.wnd_nodes[ans.number].status = SRP_sender.WndMsgStatus.CAN_BE_USED
-
-            # долго нет ответа с последнего подтверждения
-            curr_time = time.time()
-            for i in range(self.window_size):
-                if self.wnd_nodes[i].number >= self.max_number:
-                    continue
-
-                send_time = self.wnd_nodes[i].time
-                if curr_time - send_time > self.timeout:
-                    # произошёл сбой, нужно повторить отправку этого сообщения
-                    self.wnd_nodes[i].status = SRP_sender.WndMsgStatus.NEED_REPEAT
-
-            # отправляем новые или повторяем, если необходимо
-            for i in range(self.window_size):
-                if self.wnd_nodes[i].number >= self.max_number:
-                    continue
-
-                if self.wnd_nodes[i].status == SRP_sender.WndMsgStatus.BUSY:
-                    continue
-
-                elif self.wnd_nodes[i].status == SRP_sender.WndMsgStatus.NEED_REPEAT:
-                    self.wnd_nodes[i].status = SRP_sender.WndMsgStatus.BUSY
-                    self.wnd_nodes[i].time = time.time()
-
-                    msg = Message()
-                    msg.number = i
-                    msg.real_number = self.wnd_nodes[i].number
-                    self.send_msg_queue.send_message(msg)
-                    self.posted_msgs.append(f"{msg.real_number}({msg.number})")
-
-                elif self.wnd_nodes[i].status == SRP_sender.WndMsgStatus.CAN_BE_USED:
-                    self.wnd_nodes[i].status = SRP_sender.WndMsgStatus.BUSY
-                    self.wnd_nodes[i].time = time.time()
-                    self.wnd_nodes[i].number = (
-                        self.wnd_nodes[i].number + self.window_size
-                    )
-
-                    if self.wnd_nodes[i].number >= self.max_number:
-                        continue
-
-                    msg = Message()
-                    msg.number = i
-                    msg.real_number = self.wnd_nodes[i].number
-                    self.send_msg_queue.send_message(msg)
-                    self.posted_msgs.append(f"{msg.real_number}({msg.number})")
-
-    def is_finished(self):
-        return self.ans_count == self.max_number
-
-
-class SRP_receiver:
-    def __init__(self, answer_msg_queue, send_msg_queue, received_msgs):
-        self.answer_msg_queue = answer_msg_queue
-        self.send_msg_queue = send_msg_queue
-        self.received_msgs = received_msgs
+import numpy as np
+
+from arq import ARQ_receiver, ARQ_sender
+from message import MessageStatus
+
+
+def unique_slots(slots):
+    # Номера слотов без повторов в порядке их первого появления
+    _, first = np.unique(slots, return_index=True)
+    return slots[np.sort(first)]
+
+
+class SRP_sender(ARQ_sender):
+    # Состояния слотов окна
+    BUSY = 0
+    NEED_REPEAT = 1
+    CAN_BE_USED = 2
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        window_size = self.window_size
+
+        # Состояние окна хранится в параллельных массивах по номеру слота:
+        # состояние, время первой и последней отправки, срок повтора,
+        # номер сообщения и число его отправок
+        self.status = np.full(window_size, SRP_sender.NEED_REPEAT, dtype=np.int8)
+        self.first_send_time = np.zeros(window_size)
+        self.send_time = np.zeros(window_size)
+        self.deadline = np.zeros(window_size)
+        self.number = np.arange(window_size, dtype=np.int64)
+        self.transmissions = np.zeros(window_size, dtype=np.int64)
+
+        # Очередь слотов, готовых к отправке нового или повтору старого сообщения,
+        # и куча сроков повторной отправки (срок, номер слота) для занятых слотов.
+        # Записи кучи не удаляются при подтверждении, а пропускаются,
+        # если срок слота с тех пор изменился
+        self.ready_slots = deque(range(min(window_size, self.max_number)))
+        self.deadlines = []
+
+    def send(self):
+        if self.ans_count >= self.max_number:
+            return
+
+        curr_time = self.clock()
+
+        # обрабатываем все пришедшие подтверждения:
+        # (номер слота, номер сообщения, кумулятивный номер)
+        acks = []
+        while self.answer_msg_queue.has_msg():
+            ans = self.answer_msg_queue.get_message()
+            # подтверждение, потерянное в канале, до отправителя не дошло
+            if ans.status != MessageStatus.LOST:
+                acks.append((ans.number, ans.real_number, ans.ack_number))
+            self.pool.release(ans)
+        if acks:
+            self.process_acks(np.array(acks, dtype=np.int64), curr_time)
+
+        self.process_timeouts(curr_time)
+        self.transmit(curr_time)
+
+    def process_acks(self, acks, curr_time):
+        slots, numbers = acks[:, 0], acks[:, 1]
+        # повторные и устаревшие подтверждения пропускаем
+        valid = (self.status[slots] != SRP_sender.CAN_BE_USED) & (
+            self.number[slots] == numbers
+        )
+        self.acknowledge(unique_slots(slots[valid]), curr_time)
+
+    def acknowledge(self, slots, curr_time, sampled=None):
+        # sampled - слоты, по подтверждениям которых измеряется время оборота
+        if sampled is None:
+            sampled = slots
+        if self.adaptive_timeout:
+            # правило Карна: время оборота измеряется только по сообщениям,
+            # которые не отправлялись повторно
+            once = sampled[self.transmissions[sampled] == 1]
+            for sample in (curr_time - self.send_time[once]).tolist():
+                self.update_rtt(sample)
+        self.latency_sum += float(np.sum(curr_time - self.first_send_time[slots]))
+        self.transmissions[slots] = 0
+        if len(slots) > 0:
+            self.reset_backoff()
+
+        self.ans_count += len(slots)
+        self.status[slots] = SRP_sender.CAN_BE_USED
+        self.number[slots] += self.window_size
+        self.ready_slots.extend(slots[self.number[slots] < self.max_number].tolist())
+
+    def next_deadline(self):
+        # устаревшие записи кучи убираются, чтобы не будить отправителя зря
+        while self.deadlines:
+            deadline, i = self.deadlines[0]
+            if self.status[i] == SRP_sender.BUSY and self.deadline[i] == deadline:
+                return deadline
+            heapq.heappop(self.deadlines)
+        return np.inf
+
+    def process_timeouts(self, curr_time):
+        # долго нет ответа: повторяем отправку сообщений с истекшим сроком
+        expired = []
+        while self.deadlines and self.deadlines[0][0] <= curr_time:
+            expired.append(heapq.heappop(self.deadlines))
+        if not expired:
+            return
+        deadlines, slots = np.array(expired).T
+        slots = slots.astype(np.int64)
+        valid = (self.status[slots] == SRP_sender.BUSY) & (
+            self.deadline[slots] == deadlines
+        )
+        slots = slots[valid]
+        if slots.size > 0:
+            self.back_off(self.send_time[slots], curr_time)
+        self.status[slots] = SRP_sender.NEED_REPEAT
+        self.ready_slots.extend(slots.tolist())
+
+    def transmit(self, curr_time):
+        # отправляем новые или повторяем, если необходимо
+        if not self.ready_slots:
+            return
+        slots = np.array(self.ready_slots, dtype=np.int64)
+        self.ready_slots.clear()
+        slots = unique_slots(slots)
+        slots = slots[self.status[slots] != SRP_sender.BUSY]
+
+        repeat = self.transmissions[slots] > 0
+        self.retransmissions += int(np.count_nonzero(repeat))
+        self.sent_count += len(slots)
+        self.first_send_time[slots[~repeat]] = curr_time
+        self.transmissions[slots] += 1
+        self.status[slots] = SRP_sender.BUSY
+        self.send_time[slots] = curr_time
+        self.deadline[slots] = curr_time + self.retransmission_timeout()
+
+        for i, number, deadline in zip(
+            slots.tolist(),
+            self.number[slots].tolist(),
+            self.deadline[slots].tolist(),
+        ):
+            heapq.heappush(self.deadlines, (deadline, i))
+
+            self.send_msg_queue.send_message(self.pool.get(i, number))
+            self.posted_msgs.append(number, i)
+
+
+class SRP_receiver(ARQ_receiver):
     def receive(self):
         while self.send_msg_queue.has_msg():
             curr_msg = self.send_msg_queue.get_message()
 
             if curr_msg.status == MessageStatus.LOST:
-                return
-
-            ans = Message()
-            ans.number = curr_msg.number
-            self.answer_msg_queue.send_message(ans)
-            self.received_msgs.append(f"{curr_msg.real_number}({curr_msg.number})")
+                self.pool.release(curr_msg)
+                continue
+
+            self.answer_msg_queue.send_message(
+                self.pool.get(curr_msg.number, curr_msg.real_number)
+            )
+            self.received_msgs.append(curr_msg.real_number, curr_msg.number)
+            self.pool.release(curr_msg)
@@ -0,0 +1,255 @@
+from abc import ABC, abstractmethod
+
+import networkx as nx
+import numpy as np
+from networkx.algorithms.shortest_paths.weighted import (
+    dijkstra_predecessor_and_distance,
+)
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import dijkstra
+
+
+class RoutingTable(ABC):
+    # Таблицы следующего перехода до каждой станции, общие для всех потоков.
+    # Граф неориентированный, поэтому кратчайшие пути, построенные от станции,
+    # дают для каждой вершины следующий переход в сторону этой станции
+    def __init__(self, node_ids, destinations):
+        self.node_ids = np.asarray(node_ids, dtype=object)
+        self.node_index = {node_id: i for i, node_id in enumerate(self.node_ids)}
+        self.destinations = list(destinations)
+        self.edges = (np.empty(0, dtype=np.int64),) * 2 + (np.empty(0),)
+        self.stale = True
+
+        # Расстояния от каждой станции до всех вершин и ключи ребер деревьев
+        # кратчайших путей, по которым проверяется, меняют ли новые связи маршруты
+        self.distances = np.full((len(self.destinations), len(self.node_ids)), np.inf)
+        self.tree_keys = np.empty(0, dtype=np.int64)
+
+        # Непересекающиеся пути по парам станций, найденные по текущим таблицам,
+        # и ключи их ребер: пути ищутся заново только после пересчета таблиц
+        self.disjoint = {}
+        self.disjoint_keys = np.empty(0, dtype=np.int64)
+
+    def invalidate(self):
+        self.stale = True
+
+    def store_trees(self, distances, predecessors):
+        # predecessors - номера следующих переходов в сторону каждой станции,
+        # отрицательные, если перехода нет
+        n = len(self.node_ids)
+        rows, nodes = np.nonzero(predecessors >= 0)
+        hops = predecessors[rows, nodes]
+        self.distances = distances
+        self.tree_keys = np.unique(
+            np.minimum(nodes, hops).astype(np.int64) * n + np.maximum(nodes, hops)
+        )
+        self.disjoint = {}
+        self.disjoint_keys = np.empty(0, dtype=np.int64)
+
+    def changes_routes(self, u, v, weights, removed):
+        # Изменение связей может поменять маршруты, только если пропало ребро
+        # одного из деревьев кратчайших путей или найденных непересекающихся
+        # путей, новое ребро (u, v) сокращает расстояние от какой-либо станции
+        # до одной из своих вершин или может дать недостающий непересекающийся путь
+        if np.any(np.isin(removed, self.tree_keys)):
+            return True
+        if np.any(np.isin(removed, self.disjoint_keys)):
+            return True
+        if len(u) > 0 and any(
+            len(paths) < count for (_, _, count), paths in self.disjoint.items()
+        ):
+            return True
+        du = self.distances[:, u]
+        dv = self.distances[:, v]
+        return bool(np.any((du + weights < dv) | (dv + weights < du)))
+
+    @abstractmethod
+    def update(self, u, v, weights):
+        # u, v - номера вершин ребер (u < v), weights - их веса (квадраты длин)
+        pass
+
+    @abstractmethod
+    def next_hop(self, recipient):
+        # Словарь вершина -> следующий переход в сторону станции recipient
+        pass
+
+    def path(self, sender, recipient):
+        # Путь восстанавливается по таблице за число шагов, равное его длине
+        next_hop = self.next_hop(recipient)
+        if next_hop is None or sender not in next_hop:
+            return []
+
+        path = [sender]
+        node = sender
+        while node != recipient:
+            node = next_hop[node]
+            path.append(node)
+        return path
+
+    def disjoint_paths(self, sender, recipient, count):
+        # До count путей без общих ребер, между пересчетами таблиц
+        # берутся из кэша
+        key = (sender, recipient, count)
+        if key not in self.disjoint:
+            paths = self.search_disjoint_paths(sender, recipient, count)
+            self.disjoint[key] = paths
+            self.disjoint_keys = np.union1d(self.disjoint_keys, self.path_keys(paths))
+        return self.disjoint[key]
+
+    def path_keys(self, paths):
+        # Ключи ребер путей в том же виде, что и ключи связей сети
+        n = len(self.node_ids)
+        keys = [np.empty(0, dtype=np.int64)]
+        for path in paths:
+            nodes = np.array([self.node_index[node_id] for node_id in path])
+            keys.append(
+                np.minimum(nodes[:-1], nodes[1:]).astype(np.int64) * n
+                + np.maximum(nodes[:-1], nodes[1:])
+            )
+        return np.concatenate(keys)
+
+    @abstractmethod
+    def search_disjoint_paths(self, sender, recipient, count):
+        # До count путей без общих ребер: после каждого найденного
+        # кратчайшего пути его ребра исключаются из графа
+        pass
+
+
+class NetworkxRoutingTable(RoutingTable):
+    # Алгоритм Дейкстры networkx по графу со взвешенными ребрами
+    def __init__(self, node_ids, destinations):
+        super().__init__(node_ids, destinations)
+        self.graph = nx.Graph()
+        self.graph.add_nodes_from(self.node_ids.tolist())
+        self.tables = {}
+
+    def update(self, u, v, weights):
+        self.edges = (u, v, np.asarray(weights))
+        self.graph.clear_edges()
+        self.graph.add_weighted_edges_from(
+            zip(self.node_ids[u], self.node_ids[v], np.asarray(weights).tolist())
+        )
+
+        self.tables = {}
+        n = len(self.node_ids)
+        distances = np.full((len(self.destinations), n), np.inf)
+        predecessors = np.full((len(self.destinations), n), -1, dtype=np.int64)
+        for row, destination in enumerate(self.destinations):
+            pred, dist = dijkstra_predecessor_and_distance(
+                self.graph, destination, weight="weight"
+            )
+            self.tables[destination] = {
+                node: hops[0] for node, hops in pred.items() if hops
+            }
+            for node, d in dist.items():
+                distances[row, self.node_index[node]] = d
+            for node, hop in self.tables[destination].items():
+                predecessors[row, self.node_index[node]] = self.node_index[hop]
+        self.store_trees(distances, predecessors)
+        self.stale = False
+
+    def next_hop(self, recipient):
+        return self.tables.get(recipient)
+
+    def search_disjoint_paths(self, sender, recipient, count):
+        # Жадный поиск по представлению графа без ребер уже найденных путей
+        if sender not in self.node_index or recipient not in self.node_index:
+            return []
+
+        used = []
+        paths = []
+        for _ in range(count):
+            view = nx.restricted_view(self.graph, [], used)
+            try:
+                path = nx.dijkstra_path(view, sender, recipient, weight="weight")
+            except nx.NetworkXNoPath:
+                break
+            used.extend(zip(path[:-1], path[1:]))
+            paths.append(path)
+        return paths
+
+
+class SparseRoutingTable(RoutingTable):
+    # Алгоритм Дейкстры scipy.sparse.csgraph по матрице смежности в формате CSR,
+    # кратчайшие пути от всех станций ищутся одним вызовом
+    def __init__(self, node_ids, destinations):
+        super().__init__(node_ids, destinations)
+        self.destination_index = {
+            destination: i for i, destination in enumerate(self.destinations)
+        }
+        self.predecessors = None
+
+    def update(self, u, v, weights):
+        self.edges = (u, v, np.asarray(weights))
+        n = len(self.node_ids)
+        adjacency = csr_matrix((weights, (u, v)), shape=(n, n))
+        distances, self.predecessors = dijkstra(
+            adjacency,
+            directed=False,
+            indices=[self.node_index[node_id] for node_id in self.destinations],
+            return_predecessors=True,
+        )
+        self.store_trees(distances, self.predecessors)
+        self.stale = False
+
+    def next_hop(self, recipient):
+        if self.predecessors is None or recipient not in self.destination_index:
+            return None
+        return SparseNextHop(
+            self.predecessors[self.destination_index[recipient]],
+            self.node_ids,
+            self.node_index,
+        )
+
+    def search_disjoint_paths(self, sender, recipient, count):
+        # Жадный поиск по матрице смежности, из которой убираются ребра
+        # уже найденных путей
+        if sender not in self.node_index or recipient not in self.node_index:
+            return []
+
+        u, v, weights = self.edges
+        n = len(self.node_ids)
+        source = self.node_index[sender]
+        target = self.node_index[recipient]
+        keys = u * n + v
+        free = np.ones(len(keys), dtype=bool)
+
+        paths = []
+        for _ in range(count):
+            adjacency = csr_matrix((weights[free], (u[free], v[free])), shape=(n, n))
+            _, predecessors = dijkstra(
+                adjacency, directed=False, indices=source, return_predecessors=True
+            )
+            if predecessors[target] < 0:
+                break
+
+            path = [target]
+            while path[-1] != source:
+                path.append(predecessors[path[-1]])
+            path = np.array(path[::-1], dtype=np.int64)
+
+            used = np.minimum(path[:-1], path[1:]) * n + np.maximum(path[:-1], path[1:])
+            free &= ~np.isin(keys, used)
+            paths.append(self.node_ids[path].tolist())
+        return paths
+
+
+class SparseNextHop:
+    # Строка матрицы предшественников в виде словаря по идентификаторам вершин
+    def __init__(self, predecessors, node_ids, node_index):
+        self.predecessors = predecessors
+        self.node_ids = node_ids
+        self.node_index = node_index
+
+    def __contains__(self, node_id):
+        i = self.node_index.get(node_id)
+        return i is not None and self.predecessors[i] >= 0
+
+    def __getitem__(self, node_id):
+        return self.node_ids[self.predecessors[self.node_index[node_id]]]
+
+
+ROUTING_BACKENDS = {
+    "networkx": NetworkxRoutingTable,
+    "csgraph": SparseRoutingTable,
+}
@@ -1,14 +1,83 @@
 import time
 
 import numpy as np
-from panda3d.core import CardMaker, LineSegs, LPoint3, NodePath, TransparencyAttrib
 
 from node import Node
 
+EARTH_MU = 398600.4418  # Гравитационный параметр Земли в км^3/с^2
+
+
+def eccentric_anomaly(M, e):
+    E = M
+    for _ in range(10):  # Метод Ньютона для решения уравнения Кеплера
+        E_next = E + (M - E + e * np.sin(E)) / (1 - e * np.cos(E))
+        if np.all(np.abs(E_next - E) < 1e-8):
+            break
+        E = E_next
+    return E
+
+
+def true_anomaly(E, e):
+    return 2 * np.arctan2(
+        np.sqrt(1 - e) * np.cos(E / 2), np.sqrt(1 + e) * np.sin(E / 2)
+    )
+
+
+def rotation_matrix(i, omega, w):
+    # Столбцы матрицы перехода из плоскости орбиты в экваториальную плоскость,
+    # результат имеет форму (*i.shape, 3, 2)
+    p = np.stack(
+        (
+            np.cos(omega) * np.cos(w) - np.sin(omega) * np.sin(w) * np.cos(i),
+            np.sin(omega) * np.cos(w) + np.cos(omega) * np.sin(w) * np.cos(i),
+            np.sin(i) * np.sin(w),
+        ),
+        axis=-1,
+    )
+    q = np.stack(
+        (
+            -(np.cos(omega) * np.sin(w) + np.sin(omega) * np.cos(w) * np.cos(i)),
+            -np.sin(omega) * np.sin(w) + np.cos(omega) * np.cos(w) * np.cos(i),
+            np.sin(i) * np.cos(w),
+        ),
+        axis=-1,
+    )
+    return np.stack((p, q), axis=-1)
+
+
+def elements_from_config(satellites):
+    # Массив (n, 6) элементов орбит из описаний спутников в конфигурации,
+    # углы переводятся в радианы
+    elements = np.array(
+        [
+            [info["a"], info["e"], info["i"], info["omega"], info["w"], info["m"]]
+            for info in satellites
+        ],
+        dtype=np.float64,
+    ).reshape(-1, 6)
+    elements[:, 2:] = np.radians(elements[:, 2:])
+    return elements
+
+
+class OrbitalElements:
+    # Величины, которые не меняются между добавлением спутников
+    # и изменением скорости течения модельного времени
+    def __init__(self, a, e, i, omega, w, m, mu):
+        self.a = a
+        self.e = e
+        self.m = m
+        self.n = np.sqrt(mu / (a * 1000) ** 3)  # Среднее движение
+        self.b = a * np.sqrt((1 - e) * (1 + e))  # Малая полуось
+        # Матрицы перехода (N, 2, 3) из плоскости орбиты в экваториальную плоскость
+        self.rotation = rotation_matrix(i[:, 0], omega[:, 0], w[:, 0]).transpose(
+            0, 2, 1
+        )
+
 
 class Calculator:
-    def __init__(self, time_factor):
-        self.t0 = time.time()
+    def __init__(self, time_factor, clock=time.time):
+        self.clock = clock
+        self.t0 = self.clock()
         self._time_factor = time_factor
         self.a = np.array([], dtype=np.float64).reshape(
             0, 1
@@ -23,6 +92,7 @@ class Calculator:
         self.mu = np.array([], dtype=np.float64).reshape(
             0, 1
         )  # Гравитационный параметр в км^3/с^2
+        self._elements = None
 
     @property
     def time_factor(self):
@@ -30,84 +100,131 @@ class Calculator:
 
     @time_factor.setter
     def time_factor(self, value):
-        t = time.time()
+        t = self.clock()
         self.m = self.m + self.mean_motion() * (self.t0 - t) * self._time_factor
         self.t0 = t
         self._time_factor = value
+        self._elements = None
+
+    @classmethod
+    def from_elements(cls, time_factor, elements, mu=EARTH_MU, clock=time.time):
+        calculator = cls(time_factor, clock)
+        calculator.add_satellites(elements, mu)
+        return calculator
+
+    def add_satellites(self, elements, mu=EARTH_MU):
+        # Добавление сразу нескольких спутников, elements - массив (n, 6)
+        # со столбцами a, e, i, omega, w, m, углы в радианах
+        elements = np.asarray(elements, dtype=np.float64).reshape(-1, 6)
+        first = self.a.shape[0]
+        self.a = np.vstack((self.a, elements[:, 0:1]))
+        self.e = np.vstack((self.e, elements[:, 1:2]))
+        self.i = np.vstack((self.i, elements[:, 2:3]))
+        self.omega = np.vstack((self.omega, elements[:, 3:4]))
+        self.w = np.vstack((self.w, elements[:, 4:5]))
+        self.m = np.vstack((self.m, elements[:, 5:6]))
+        self.mu = np.vstack(
+            (self.mu, np.broadcast_to(mu, (elements.shape[0],)).reshape(-1, 1))
+        )
+        self._elements = None
+        return range(first, self.a.shape[0])
 
     def add_satellite(self, satellite):
-        self.a = np.vstack((self.a, satellite.a))
-        self.e = np.vstack((self.e, satellite.e))
-        self.i = np.vstack((self.i, satellite.i))
-        self.omega = np.vstack((self.omega, satellite.omega))
-        self.w = np.vstack((self.w, satellite.w))
-        self.m = np.vstack((self.m, satellite.m))
-        self.mu = np.vstack((self.mu, satellite.mu))
-        return self.a.shape[0] - 1
+        return self.add_satellites(
+            [
+                satellite.a,
+                satellite.e,
+                satellite.i,
+                satellite.omega,
+                satellite.w,
+                satellite.m,
+            ],
+            satellite.mu,
+        )[0]
+
+    @property
+    def elements(self):
+        if self._elements is None:
+            self._elements = OrbitalElements(
+                self.a, self.e, self.i, self.omega, self.w, self.m, self.mu
+            )
+        return self._elements
 
     def mean_motion(self):
-        return np.sqrt(self.mu / (self.a * 1000) ** 3)
+        return self.elements.n
 
     def mean_anomaly(self, delta_t):
         n = self.mean_motion()
         return self.m + n * delta_t
 
     def eccentric_anomaly(self, M):
-        E = M
-        for _ in range(10):  # Метод Ньютона для решения уравнения Кеплера
-            E_next = E + (M - E + self.e * np.sin(E)) / (1 - self.e * np.cos(E))
-            if np.all(np.abs(E_next - E) < 1e-8):
-                break
-            E = E_next
-        return E
+        return eccentric_anomaly(M, self.e)
 
     def true_anomaly(self, E):
-        return 2 * np.arctan2(
-            np.sqrt(1 - self.e) * np.cos(E / 2), np.sqrt(1 + self.e) * np.sin(E / 2)
-        )
+        return true_anomaly(E, self.e)
 
     def radius(self, E):
         return self.a * (1 - self.e * np.cos(E))
 
-    def update_position(self):
-        t = time.time()
-        delta_t = (self.t0 - t) * self._time_factor
-        M = self.mean_anomaly(delta_t)
-        E = self.eccentric_anomaly(M)
-        nu = self.true_anomaly(E)
-        r = self.radius(E)
-
-        x_orb = r * np.cos(nu)
-        y_orb = r * np.sin(nu)
-
-        # Вычисление координат в экваториальной плоскости
-        self.x_eq = x_orb * (
-            np.cos(self.omega) * np.cos(self.w)
-            - np.sin(self.omega) * np.sin(self.w) * np.cos(self.i)
-        ) - y_orb * (
-            np.cos(self.omega) * np.sin(self.w)
-            + np.sin(self.omega) * np.cos(self.w) * np.cos(self.i)
+    def delta_time(self, t):
+        # Модельное время относительно t0 для момента t по часам clock
+        return (self.t0 - t) * self._time_factor
+
+    def position_at(self, delta_t, index=slice(None)):
+        # Координаты спутников с номерами index в моменты delta_t модельного времени,
+        # delta_t транслируется с массивами элементов формы (n, 1),
+        # результат имеет форму (n, T, 3)
+        elements = self.elements
+        e = elements.e[index]
+        M = elements.m[index] + elements.n[index] * delta_t
+        E = eccentric_anomaly(M, e)
+
+        # Координаты в плоскости орбиты, выраженные через эксцентрическую аномалию
+        orbit = np.stack(
+            (
+                elements.a[index] * (e - np.cos(E)),
+                elements.b[index] * np.sin(E),
+            ),
+            axis=-1,
         )
-        self.y_eq = x_orb * (
-            np.sin(self.omega) * np.cos(self.w)
-            + np.cos(self.omega) * np.sin(self.w) * np.cos(self.i)
-        ) + y_orb * (
-            -np.sin(self.omega) * np.sin(self.w)
-            + np.cos(self.omega) * np.cos(self.w) * np.cos(self.i)
+        return np.matmul(orbit, elements.rotation[index])
+
+    def orbit_points(self, num_segments, index=slice(None)):
+        # Точки эллипсов орбит спутников index для равномерной сетки средней
+        # аномалии от 0 до 2pi, результат имеет форму (n, num_segments + 1, 3)
+        elements = self.elements
+        e = elements.e[index]
+        E = eccentric_anomaly(np.linspace(0, 2 * np.pi, num_segments + 1), e)
+        orbit = np.stack(
+            (elements.a[index] * (e - np.cos(E)), elements.b[index] * np.sin(E)),
+            axis=-1,
         )
-        self.z_eq = x_orb * np.sin(self.i) * np.sin(self.w) + y_orb * np.sin(
-            self.i
-        ) * np.cos(self.w)
+        return np.matmul(orbit, elements.rotation[index])
+
+    def propagate(self, times):
+        # Координаты всех спутников в моменты times по часам clock,
+        # результат имеет форму (N, T, 3)
+        delta_t = self.delta_time(np.atleast_1d(np.asarray(times, dtype=np.float64)))
+        return self.position_at(delta_t)
+
+    def update_position(self):
+        delta_t = self.delta_time(self.clock())
+        position = self.position_at(delta_t)
+        self.x_eq = position[..., 0]
+        self.y_eq = position[..., 1]
+        self.z_eq = position[..., 2]
 
     def get_satellite_position(self, index):
         return (self.x_eq[index], self.y_eq[index], self.z_eq[index])
 
+    def positions(self):
+        # Координаты всех спутников относительно центра Земли, массив (N, 3)
+        return np.hstack((self.x_eq, self.y_eq, self.z_eq))
+
 
 class Satellite(Node):
     def __init__(
         self,
-        loader,
-        parent,
         pos_shift,
         id,
         calculator,
@@ -117,19 +234,11 @@ class Satellite(Node):
         omega,
         w,
         m,
-        mu=398600.4418,
-        sprite_size=1,
-        num_orbit_segments=1000,
-        line_color=(1, 1, 1, 0.8),
-        line_thickness=1.5,
+        mu=EARTH_MU,
+        index=None,
     ):
         super().__init__(id)
 
-        self.sprite_size = sprite_size
-        self.num_orbit_segments = num_orbit_segments
-        self.line_color = line_color
-        self.line_thickness = line_thickness
-
         self.pos_shift = pos_shift
 
         self.a = a  # Большая полуось в тыс.км
@@ -141,133 +250,18 @@ class Satellite(Node):
         self.mu = mu  # Гравитационный параметр в км^3/с^2
 
         self.calculator = calculator
-        self.index = self.calculator.add_satellite(self)
-
-        self.setup_sprite(loader, parent)
-        self.setup_orbit(parent)
-
-    def mean_motion(self):
-        return np.sqrt(self.mu / (self.a * 1000) ** 3)
-
-    def mean_anomaly(self, delta_t):
-        n = self.mean_motion()
-        return self.m + n * delta_t
-
-    def eccentric_anomaly(self, M):
-        E = M
-        for _ in range(10):  # Метод Ньютона для решения уравнения Кеплера
-            E_next = E + (M - E + self.e * np.sin(E)) / (1 - self.e * np.cos(E))
-            if abs(E_next - E) < 1e-8:
-                break
-            E = E_next
-        return E
-
-    def true_anomaly(self, E):
-        return 2 * np.arctan2(
-            np.sqrt(1 - self.e) * np.cos(E / 2), np.sqrt(1 + self.e) * np.sin(E / 2)
-        )
-
-    def radius(self, E):
-        return self.a * (1 - self.e * np.cos(E))
+        if index is None:
+            index = self.calculator.add_satellite(self)
+        self.index = index  # Номер спутника в калькуляторе
 
     def position(self):
         return self.calculator.get_satellite_position(self.index)
 
-    def _orbit(self):
-        rad = np.linspace(0, 2 * np.pi, self.num_orbit_segments + 1)
-        orbit = []
-        for M in rad:
-            E = self.eccentric_anomaly(M)
-            nu = self.true_anomaly(E)
-            r = self.radius(E)
-
-            x_orb = r * np.cos(nu)
-            y_orb = r * np.sin(nu)
-
-            # Вычисление координат в экваториальной плоскости
-            x_eq = x_orb * (
-                np.cos(self.omega) * np.cos(self.w)
-                - np.sin(self.omega) * np.sin(self.w) * np.cos(self.i)
-            ) - y_orb * (
-                np.cos(self.omega) * np.sin(self.w)
-                + np.sin(self.omega) * np.cos(self.w) * np.cos(self.i)
-            )
-            y_eq = x_orb * (
-                np.sin(self.omega) * np.cos(self.w)
-                + np.cos(self.omega) * np.sin(self.w) * np.cos(self.i)
-            ) + y_orb * (
-                -np.sin(self.omega) * np.sin(self.w)
-                + np.cos(self.omega) * np.cos(self.w) * np.cos(self.i)
-            )
-            z_eq = x_orb * np.sin(self.i) * np.sin(self.w) + y_orb * np.sin(
-                self.i
-            ) * np.cos(self.w)
-            orbit.append((x_eq, y_eq, z_eq))
-        return orbit
-
-    def setup_orbit(self, parent):
-        # Создаем LineSegs для рисования орбиты
-        ls = LineSegs()
-        ls.set_color(*self.line_color)
-        ls.set_thickness(self.line_thickness)  # Толщина линии
-
-        # Рисуем эллипс
-        orbit_points = self._orbit()
-        for x, y, z in orbit_points:
-            ls.draw_to(LPoint3(x, y, z))
-
-        # Создаем NodePath для орбиты
-        orbit_node = ls.create()
-        self.orbit = NodePath(orbit_node)
-
-        # Отключаем освещение для орбиты
-        self.orbit.setLightOff()
-
-        # Прикрепляем орбиту к сцене
-        self.orbit.reparent_to(parent)
-
-        # Устанавливаем позицию орбиты относительно сцены
-        self.orbit.set_pos(*self.pos_shift)
-
-    def setup_sprite(self, loader, parent):
-        # Создаем CardMaker для создания спрайта
-        cm = CardMaker("sprite")
-        coord = self.sprite_size / 2
-        cm.set_frame(-coord, coord, -coord, coord)  # Размеры спрайта
-
-        # Создаем NodePath для спрайта
-        sprite_node = cm.generate()
-        self.sprite = NodePath(sprite_node)
-
-        # Загружаем текстуру для спрайта
-        texture = loader.load_texture("models\sprites\satellite.png")
-        self.sprite.set_texture(texture)
-
-        # Устанавливаем прозрачность
-        self.sprite.set_transparency(TransparencyAttrib.M_alpha)
-
-        # Прикрепляем спрайт к сцене
-        self.sprite.reparent_to(parent)
-
-        # Устанавливаем позицию спрайта относительно сцены
-        # x, y, z = self.position()
-        x, y, z = 0.0, 0.0, 0.0
-        self.sprite.set_pos(
-            x + self.pos_shift[0], y + self.pos_shift[1], z + self.pos_shift[2]
-        )
-
-        # Применяем эффект билборда, чтобы спрайт всегда был повернут к камере
-        self.sprite.set_billboard_point_eye()
-
-        # Отключаем освещение для спрайта
-        self.sprite.setLightOff()
-
-    def update(self):
-        x, y, z = self.position()
-        self.sprite.set_pos(
-            x + self.pos_shift[0], y + self.pos_shift[1], z + self.pos_shift[2]
-        )
-
     @property
     def pos(self) -> tuple:
-        return self.sprite.getX(), self.sprite.getY(), self.sprite.getZ()
+        x, y, z = self.position()
+        return (
+            x[0] + self.pos_shift[0],
+            y[0] + self.pos_shift[1],
+            z[0] + self.pos_shift[2],
+        )
@@ -1,14 +1,22 @@
 import numpy as np
-from panda3d.core import CardMaker, NodePath, TransparencyAttrib
 
 from node import Node
 
 
+def local_positions(lat, long, r, angle):
+    # Координаты станций относительно центра Земли, все параметры транслируются
+    # между собой, результат имеет форму (*shape, 3)
+    long = np.radians(np.subtract(long, angle))
+    lat = np.radians(lat)
+    x = r * np.cos(lat) * np.sin(long)
+    y = r * np.cos(lat) * np.cos(long)
+    z = np.broadcast_to(r * np.sin(lat), x.shape)
+    return np.stack((x, y, z), axis=-1)
+
+
 class SatelliteDash(Node):
     def __init__(
         self,
-        loader,
-        parent,
         id,
         earth,
         lat,
@@ -22,60 +30,21 @@ class SatelliteDash(Node):
         self.lat = lat  # Широта
         self.long = 180 - long  # Долгота
 
-        self.setup_sprite(loader, parent)
-
-    def position(self):
-        r = self.earth.radius + self.sprite_size / 3
+    @property
+    def radius(self):
+        # Станция расположена чуть выше поверхности Земли
+        return self.earth.radius + self.sprite_size / 3
 
-        long = self.long - self.earth.angle
+    def local_position(self, angle):
+        # Координаты станции относительно центра Земли при угле поворота Земли angle,
+        # angle может быть массивом, тогда результат имеет форму (*angle.shape, 3)
+        return local_positions(self.lat, self.long, self.radius, angle)
 
-        x = (
-            r * np.cos(np.radians(self.lat)) * np.sin(np.radians(long))
-            + self.earth.model.getX()
-        )
-        y = (
-            r * np.cos(np.radians(self.lat)) * np.cos(np.radians(long))
-            + self.earth.model.getY()
-        )
-        z = r * np.sin(np.radians(self.lat)) + self.earth.model.getZ()
+    def position(self):
+        x, y, z = self.local_position(self.earth.angle) + self.earth.center()
 
         return x, y, z
 
-    def setup_sprite(self, loader, parent):
-        # Создаем CardMaker для создания спрайта
-        cm = CardMaker("sprite")
-        coord = self.sprite_size / 2
-        cm.set_frame(-coord, coord, -coord, coord)  # Размеры спрайта
-
-        # Создаем NodePath для спрайта
-        sprite_node = cm.generate()
-        self.sprite = NodePath(sprite_node)
-
-        # Загружаем текстуру для спрайта
-        texture = loader.load_texture("models\sprites\satellite-dash.png")
-        self.sprite.set_texture(texture)
-
-        # Устанавливаем прозрачность
-        self.sprite.set_transparency(TransparencyAttrib.M_alpha)
-
-        # Прикрепляем спрайт к сцене
-        self.sprite.reparent_to(parent)
-
-        # Устанавливаем позицию спрайта относительно сцены
-        x, y, z = self.position()
-        self.sprite.set_pos(x, y, z)
-
-        # Применяем эффект билборда, чтобы спрайт всегда был повернут к камере
-        self.sprite.set_billboard_point_eye()
-
-        # Отключаем освещение для спрайта
-        self.sprite.setLightOff()
-
-    def update(self, task):
-        x, y, z = self.position()
-        self.sprite.set_pos(x, y, z)
-        return task.again
-
     @property
     def pos(self) -> tuple:
-        return self.sprite.getX(), self.sprite.getY(), self.sprite.getZ()
+        return self.position()
@@ -0,0 +1,98 @@
+import asyncio
+import heapq
+import itertools
+import time
+from threading import Timer
+
+
+class TimerScheduler:
+    # Планировщик реального времени: каждое событие выполняется в своем потоке Timer
+    def time(self):
+        return time.time()
+
+    def call_later(self, delay, callback, *args):
+        timer = Timer(delay, callback, args)
+        timer.start()
+        return timer
+
+
+class AsyncioScheduler:
+    # Планировщик реального времени на одном цикле событий asyncio, который
+    # прокручивается из менеджера задач Panda3D в основном потоке
+    def __init__(self):
+        self.loop = asyncio.new_event_loop()
+
+    def time(self):
+        return time.time()
+
+    def call_later(self, delay, callback, *args):
+        return self.loop.create_task(self._call_later(delay, callback, args))
+
+    async def _call_later(self, delay, callback, args):
+        await asyncio.sleep(delay)
+        callback(*args)
+
+    def step(self, task):
+        # Выполняем все готовые к этому моменту сопрограммы и возвращаемся
+        self.loop.call_soon(self.loop.stop)
+        self.loop.run_forever()
+        return task.cont
+
+    def close(self):
+        # Отменяем отложенные события и даем им завершиться до закрытия цикла
+        pending = asyncio.all_tasks(self.loop)
+        for task in pending:
+            task.cancel()
+        self.loop.run_until_complete(asyncio.gather(*pending, return_exceptions=True))
+        self.loop.close()
+
+
+class Event:
+    __slots__ = ("time", "callback", "args", "cancelled")
+
+    def __init__(self, time, callback, args):
+        self.time = time
+        self.callback = callback
+        self.args = args
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+
+class EventScheduler:
+    # Дискретно-событийный планировщик: очередь событий с приоритетом по времени
+    # на модельных часах, которые сразу переводятся к ближайшему событию
+    def __init__(self, start=0.0, on_advance=None):
+        self.now = start
+        self.on_advance = on_advance
+        self.queue = []
+        self.counter = itertools.count()
+
+    def time(self):
+        return self.now
+
+    def call_later(self, delay, callback, *args):
+        event = Event(self.now + max(0.0, delay), callback, args)
+        # Порядковый номер сохраняет порядок событий с одинаковым временем
+        heapq.heappush(self.queue, (event.time, next(self.counter), event))
+        return event
+
+    def run(self, until=None, stop=None):
+        while self.queue:
+            t, _, event = self.queue[0]
+            if until is not None and t > until:
+                self.now = until
+                break
+            heapq.heappop(self.queue)
+            if event.cancelled:
+                continue
+
+            if t != self.now:
+                self.now = t
+                if self.on_advance:
+                    self.on_advance()
+
+            event.callback(*event.args)
+            if stop is not None and stop():
+                break
@@ -10,9 +10,12 @@ from camera_controller import CameraController
 from earth import Earth
 from menu import Menu
 from network import Network
-from satellite import Calculator, Satellite
-from satellite_dash import SatelliteDash
+from orbit_tracks import OrbitTracks, plane_colors
+from satellite import Calculator, Satellite, elements_from_config
+from satellite_dash import SatelliteDash, local_positions
+from scheduler import AsyncioScheduler, TimerScheduler
 from skybox import Skybox
+from sprites import PointSprites
 
 p3d.load_prc_file_data(
     "",
@@ -113,10 +116,17 @@ class App(ShowBase):
         # Установка станций
         self.setup_satellite_dashes(config)
 
-        # Установка топологии сети
+        # Установка топологии сети, события сети выполняются либо в цикле asyncio
+        # из менеджера задач, либо по таймерам в отдельных потоках
+        if config["network_runtime"] == "asyncio":
+            self.network_scheduler = AsyncioScheduler()
+            self.taskMgr.add(self.network_scheduler.step, "network_runtime")
+        else:
+            self.network_scheduler = TimerScheduler()
         self.network = Network(
             self.central_node,
             self.earth,
+            self.calculator,
             self.satellites,
             self.dashes,
             config["sending_interval"],
@@ -127,8 +137,19 @@ class App(ShowBase):
             config["dash_cone_angle"],
             tuple(config["path_color"]),
             config["path_thickness"],
+            config["max_isl_range"],
+            config["contact_plan_horizon"],
+            config["contact_plan_step"],
+            self.network_scheduler,
+            config["routing_backend"],
+            config["route_horizon"],
+            config["multipath_count"],
+            config["random_seed"],
+            config["adaptive_timeout"],
+            config["arq_protocol"],
         )
 
+        self.network.start()
         self.taskMgr.add(self.network.update, "update_network")
 
     def increase_time_factor(self):
@@ -143,36 +164,55 @@ class App(ShowBase):
         self.satellites = []
         sprite_size = config["sprite_size"]
         time_factor = config["time_factor"]
-        self.calculator = Calculator(time_factor)
-        num_orbit_segments = config["num_orbit_segments"]
-        orbit_color = tuple(config["orbit_color"])
-        orbit_thickness = config["orbit_thickness"]
-        for i, satellite_info in enumerate(config["satellites"]):
+
+        # Элементы орбит всех спутников загружаются в калькулятор одним массивом
+        elements = elements_from_config(config["satellites"])
+        self.calculator = Calculator.from_elements(time_factor, elements)
+
+        for i, (a, e, incline, omega, w, m) in enumerate(elements):
             satellite = Satellite(
-                self.loader,
-                self.central_node,
                 self.earth_pos,
                 f"s_{i}",
                 calculator=self.calculator,
-                a=satellite_info["a"],
-                e=satellite_info["e"],
-                i=np.radians(satellite_info["i"]),
-                omega=np.radians(satellite_info["omega"]),
-                w=np.radians(satellite_info["w"]),
-                m=np.radians(satellite_info["m"]),
-                sprite_size=sprite_size,
-                num_orbit_segments=num_orbit_segments,
-                line_color=orbit_color,
-                line_thickness=orbit_thickness,
+                a=a,
+                e=e,
+                i=incline,
+                omega=omega,
+                w=w,
+                m=m,
+                index=i,
             )
             self.satellites.append(satellite)
+
+        # Все орбиты рисуются из общих буферов вершин
+        if config["orbit_plane_colors"]:
+            orbit_colors = plane_colors(self.calculator, config["orbit_plane_colors"])
+        else:
+            orbit_colors = tuple(config["orbit_color"])
+        self.orbit_tracks = OrbitTracks(
+            self.central_node,
+            self.calculator,
+            self.earth_pos,
+            config["num_orbit_segments"],
+            orbit_colors,
+            config["orbit_thickness"],
+        )
+
+        # Все спутники рисуются одним набором точечных спрайтов
+        self.satellite_sprites = PointSprites(
+            self.loader,
+            self.central_node,
+            "satellites",
+            "models/sprites/satellite.png",
+            len(self.satellites),
+            sprite_size,
+        )
         self.calculator.update_position()
         self.taskMgr.add(self.update_satellites, "update_satellites")
 
     def update_satellites(self, task):
         self.calculator.update_position()
-        for satellite in self.satellites:
-            satellite.update()
+        self.satellite_sprites.update(self.calculator.positions() + self.earth_pos)
         return task.again
 
     def setup_satellite_dashes(self, config):
@@ -180,8 +220,6 @@ class App(ShowBase):
         sprite_size = config["sprite_size"]
         for i, dash_info in enumerate(config["dashes"]):
             dash = SatelliteDash(
-                self.loader,
-                self.central_node,
                 f"d_{i}",
                 self.earth,
                 dash_info["lat"],
@@ -189,13 +227,37 @@ class App(ShowBase):
                 sprite_size,
             )
             self.dashes.append(dash)
-            self.taskMgr.add(dash.update, f"update_dash_{i}")
+
+        # Координаты станций на каждом кадре вычисляются одним вызовом
+        self.dash_lat = np.array([dash.lat for dash in self.dashes])
+        self.dash_long = np.array([dash.long for dash in self.dashes])
+        self.dash_radius = np.array([dash.radius for dash in self.dashes])
+
+        # Все станции рисуются одним набором точечных спрайтов
+        self.dash_sprites = PointSprites(
+            self.loader,
+            self.central_node,
+            "dashes",
+            "models/sprites/satellite-dash.png",
+            len(self.dashes),
+            sprite_size,
+        )
+        self.taskMgr.add(self.update_satellite_dashes, "update_dashes")
+
+    def update_satellite_dashes(self, task):
+        positions = local_positions(
+            self.dash_lat, self.dash_long, self.dash_radius, self.earth.angle
+        ).reshape(-1, 3)
+        self.dash_sprites.update(positions + self.earth.center())
+        return task.again
 
     def test_send(self):
-        self.network.send("d_0", "d_1", 100)
+        self.network.send(0, 1, 100)
 
     def close(self):
         self.network.close()
+        if isinstance(self.network_scheduler, AsyncioScheduler):
+            self.network_scheduler.close()
 
 
 def main():
@@ -0,0 +1,61 @@
+import numpy as np
+from panda3d.core import (
+    Geom,
+    GeomNode,
+    GeomPoints,
+    GeomVertexData,
+    GeomVertexFormat,
+    NodePath,
+    OmniBoundingVolume,
+    TexGenAttrib,
+    TextureStage,
+    TransparencyAttrib,
+)
+
+
+class PointSprites:
+    def __init__(self, loader, parent, name, texture_path, count, size=1):
+        self.count = count
+
+        # Координаты всех спрайтов хранятся в одном буфере вершин,
+        # который переписывается целиком при каждом обновлении
+        self.vdata = GeomVertexData(name, GeomVertexFormat.get_v3(), Geom.UH_dynamic)
+        self.vdata.unclean_set_num_rows(count)
+
+        points = GeomPoints(Geom.UH_static)
+        points.add_consecutive_vertices(0, count)
+        points.close_primitive()
+
+        geom = Geom(self.vdata)
+        geom.add_primitive(points)
+        geom_node = GeomNode(name)
+        geom_node.add_geom(geom)
+        # Спрайты перемещаются каждый кадр, поэтому узел никогда не отсекается
+        geom_node.set_bounds(OmniBoundingVolume())
+        geom_node.set_final(True)
+
+        self.node = NodePath(geom_node)
+
+        # Загружаем текстуру для спрайтов
+        texture = loader.load_texture(texture_path)
+        self.node.set_texture(texture)
+
+        # Каждая точка рисуется квадратом размера size, всегда повернутым к камере
+        self.node.set_tex_gen(TextureStage.get_default(), TexGenAttrib.M_point_sprite)
+        self.node.set_render_mode_thickness(size)
+        self.node.set_render_mode_perspective(True)
+
+        # Устанавливаем прозрачность
+        self.node.set_transparency(TransparencyAttrib.M_alpha)
+
+        # Отключаем освещение для спрайтов
+        self.node.setLightOff()
+
+        # Прикрепляем спрайты к сцене
+        self.node.reparent_to(parent)
+
+    def update(self, positions):
+        # positions - массив (count, 3) координат спрайтов относительно сцены
+        memoryview(self.vdata.modify_array(0)).cast("B").cast("f")[:] = (
+            np.ascontiguousarray(positions, dtype=np.float32).ravel()
+        )
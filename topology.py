@@ -0,0 +1,119 @@
+import numpy as np
+from scipy.spatial import cKDTree
+
+# Скорость света, тыс. км/с (все расстояния задаются в тысячах километров)
+SPEED_OF_LIGHT = 299.792458
+
+
+def dash_visibility(dash_pos, satellite_pos, cone_cos):
+    # Спутник виден станции, если он попадает в конус с осью вдоль радиуса станции.
+    # Все координаты задаются относительно центра Земли, массивы транслируются
+    # по первым осям, последняя ось - координаты (x, y, z)
+    e1 = dash_pos
+    e2 = satellite_pos - dash_pos
+    with np.errstate(divide="ignore", invalid="ignore"):
+        cos = np.sum(e1 * e2, axis=-1) / np.sqrt(
+            np.sum(e1 * e1, axis=-1) * np.sum(e2 * e2, axis=-1)
+        )
+    return cos > cone_cos
+
+
+def satellite_visibility(p1, p2, earth_radius):
+    # Прямая видимость между спутниками: луч из p1 в p2 не должен пересекать Землю
+    e3 = p2 - p1
+    e3_mod2 = np.sum(e3 * e3, axis=-1)
+    e1_mod2 = np.sum(p1 * p1, axis=-1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        cos_beta_2 = np.sum(p1 * e3, axis=-1) ** 2 / (e1_mod2 * e3_mod2)
+        cos_alpha_2 = earth_radius / e1_mod2
+    return cos_beta_2 < cos_alpha_2
+
+
+class Topology:
+    def __init__(
+        self, earth_radius, dash_cone_angle=60, max_isl_range=None, block_size=1 << 20
+    ):
+        self.earth_radius = earth_radius
+        self.dash_cone_cos = np.cos(np.radians(dash_cone_angle))
+        # Максимальная дальность межспутниковой связи, None - без ограничения
+        self.max_isl_range = max_isl_range
+        # Ограничение на число пар, обрабатываемых за один проход,
+        # чтобы промежуточные массивы не разрастались как N^2
+        self.block_size = block_size
+
+    def dash_links(self, dash_pos, satellite_pos):
+        # Матрица смежности станция-спутник размера (D, S)
+        return dash_visibility(
+            dash_pos[:, np.newaxis, :],
+            satellite_pos[np.newaxis, :, :],
+            self.dash_cone_cos,
+        )
+
+    def satellite_links(self, satellite_pos):
+        # Пары (i, j), i < j, спутников, находящихся в прямой видимости
+        if self.max_isl_range is None or np.isinf(self.max_isl_range):
+            return self._satellite_links_brute_force(satellite_pos)
+        return self._satellite_links_kdtree(satellite_pos)
+
+    def _satellite_links_kdtree(self, satellite_pos):
+        # Проверяем только пары, находящиеся ближе максимальной дальности связи
+        tree = cKDTree(satellite_pos)
+        pairs = tree.query_pairs(self.max_isl_range, output_type="ndarray")
+        if pairs.shape[0] == 0:
+            return np.empty(0, dtype=np.intp), np.empty(0, dtype=np.intp)
+        # query_pairs возвращает пары с i < j в произвольном порядке
+        pairs = pairs[np.lexsort((pairs[:, 1], pairs[:, 0]))]
+        i = pairs[:, 0].astype(np.intp)
+        j = pairs[:, 1].astype(np.intp)
+        visible = satellite_visibility(
+            satellite_pos[i], satellite_pos[j], self.earth_radius
+        )
+        return i[visible], j[visible]
+
+    def _satellite_links_brute_force(self, satellite_pos):
+        n = satellite_pos.shape[0]
+        rows = max(1, self.block_size // max(n, 1))
+        result_i = []
+        result_j = []
+        for start in range(0, n, rows):
+            stop = min(start + rows, n)
+            visible = satellite_visibility(
+                satellite_pos[start:stop, np.newaxis, :],
+                satellite_pos[np.newaxis, :, :],
+                self.earth_radius,
+            )
+            # Оставляем только верхний треугольник, как при обходе пар по порядку
+            visible &= (
+                np.arange(n)[np.newaxis, :] > np.arange(start, stop)[:, np.newaxis]
+            )
+            i, j = np.nonzero(visible)
+            result_i.append(i + start)
+            result_j.append(j)
+        if not result_i:
+            return np.empty(0, dtype=np.intp), np.empty(0, dtype=np.intp)
+        return np.concatenate(result_i), np.concatenate(result_j)
+
+    def edges(self, dash_pos, satellite_pos):
+        dash_i, dash_j = np.nonzero(self.dash_links(dash_pos, satellite_pos))
+        satellite_i, satellite_j = self.satellite_links(satellite_pos)
+        return (dash_i, dash_j), (satellite_i, satellite_j)
+
+    def edge_keys(self, dash_pos, satellite_pos):
+        # Вершины нумеруются сначала станциями, затем спутниками,
+        # ребро (u, v), u < v, кодируется числом u * n + v
+        d = dash_pos.shape[0]
+        n = d + satellite_pos.shape[0]
+        dash_edges, satellite_edges = self.edges(dash_pos, satellite_pos)
+        dash_keys = dash_edges[0].astype(np.int64) * n + (dash_edges[1] + d)
+        satellite_keys = (satellite_edges[0].astype(np.int64) + d) * n + (
+            satellite_edges[1] + d
+        )
+        return np.sort(np.concatenate((dash_keys, satellite_keys)))
+
+    def pair_visibility(self, p1, p2, dash):
+        # Поэлементная проверка пар, dash - признак того, что p1 является станцией
+        visible = satellite_visibility(p1, p2, self.earth_radius)
+        if self.max_isl_range is not None and not np.isinf(self.max_isl_range):
+            e = p2 - p1
+            visible &= np.sum(e * e, axis=-1) <= self.max_isl_range**2
+        return np.where(dash, dash_visibility(p1, p2, self.dash_cone_cos), visible)